@@ -10,7 +10,9 @@ A dependable weather data collection system with:
 """
 
 from .database import Database
-from .fetcher import ANMFetcher, CityForecast, WeatherAlert, FetchError, ValidationError
+from .fetcher import (
+    ANMFetcher, CityForecast, ForecastBatch, WeatherAlert, FetchError, ValidationError
+)
 from .scheduler import WeatherScheduler, FetchResult
 from .api import app
 
@@ -20,6 +22,7 @@ __all__ = [
     "Database",
     "ANMFetcher",
     "CityForecast",
+    "ForecastBatch",
     "WeatherAlert",
     "FetchError",
     "ValidationError",
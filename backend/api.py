@@ -7,20 +7,23 @@ Provides endpoints for:
 - System trustworthiness monitoring
 """
 
+import asyncio
 import logging
 import os
-from typing import List, Optional
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from contextlib import asynccontextmanager
-from datetime import datetime
 
+import orjson
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 from prometheus_fastapi_instrumentator import Instrumentator
 from prometheus_client import Gauge, Counter
 
 from .database import Database
-from .scheduler import WeatherScheduler, FetchResult
+from .scheduler import WeatherScheduler, FetchResult, SyncStatus
 
 logging.basicConfig(
     level=os.getenv("LOG_LEVEL", "INFO"),
@@ -33,6 +36,10 @@ logger = logging.getLogger(__name__)
 # Pydantic Models
 # =============================================================================
 
+# Rows read back from our own SQLite schema already have the right types, so
+# list endpoints build CityForecast/WeatherAlert with model_construct() and
+# skip a second round of field validation.
+
 class CityForecast(BaseModel):
     id: int
     city: str
@@ -117,16 +124,16 @@ class HealthResponse(BaseModel):
 
 db: Optional[Database] = None
 scheduler: Optional[WeatherScheduler] = None
-start_time: Optional[datetime] = None
+start_time_ns: Optional[int] = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
-    global db, scheduler, start_time
+    global db, scheduler, start_time_ns
     
     logger.info("Starting Weather RSS Feed Application...")
-    start_time = datetime.utcnow()
+    start_time_ns = time.monotonic_ns()
     
     # Initialize database
     db = Database()
@@ -161,6 +168,13 @@ async def lifespan(app: FastAPI):
 # FastAPI Application
 # =============================================================================
 
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, for endpoints returning plain dicts."""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
 app = FastAPI(
     title="Romania Weather API",
     description="Weather forecasts and alerts from ANM (Romanian National Meteorology)",
@@ -213,20 +227,18 @@ FETCH_TOTAL = Counter(
     ['source_type', 'status']
 )
 
-def update_prometheus_metrics():
-    """Update custom Prometheus metrics from current state."""
-    if not db or not scheduler:
-        return
-    
+def update_prometheus_metrics(
+    sync_status: Optional[SyncStatus],
+    source_health: List[dict]
+) -> None:
+    """Update custom Prometheus metrics from an already-fetched status snapshot."""
     try:
-        sync_status = scheduler.get_sync_status()
         if sync_status:
             FORECAST_SOURCE_UP.set(1 if sync_status.forecast_healthy else 0)
             ALERT_SOURCE_UP.set(1 if sync_status.alert_healthy else 0)
             CITIES_AVAILABLE.set(sync_status.cities_available)
             ACTIVE_ALERTS.set(sync_status.active_alerts)
         
-        source_health = db.get_system_status()
         for source in source_health:
             source_type = source.get('source_type', 'unknown')
             SOURCE_RESPONSE_TIME.labels(source_type=source_type).set(
@@ -250,25 +262,62 @@ instrumentator = Instrumentator(
 instrumentator.instrument(app).expose(app, endpoint="/metrics")
 
 
+# =============================================================================
+# Response Cache
+# =============================================================================
+
+# City lists and alert counts only change on ingest, so serve them from memory
+CITIES_CACHE_TTL_SECONDS = 60
+ALERT_COUNT_CACHE_TTL_SECONDS = 60
+RESPONSE_CACHE_MAX_ENTRIES = 1024
+
+_response_cache: Dict[Tuple, Tuple[float, Any]] = {}
+_response_cache_version: Optional[int] = None
+
+
+async def cached_response(key: Tuple, ttl: float, loader: Callable[[], Any]) -> Any:
+    """
+    Return the cached value for key, running loader() in a worker thread on a miss.
+    
+    Entries expire after ttl seconds and are dropped as soon as the
+    database reports new data via its cache version.
+    """
+    global _response_cache_version
+    
+    if db.cache_version != _response_cache_version:
+        _response_cache.clear()
+        _response_cache_version = db.cache_version
+    
+    now = time.monotonic()
+    entry = _response_cache.get(key)
+    if entry and entry[0] > now:
+        return entry[1]
+    
+    if len(_response_cache) >= RESPONSE_CACHE_MAX_ENTRIES:
+        _response_cache.clear()
+    
+    value = await asyncio.to_thread(loader)
+    _response_cache[key] = (now + ttl, value)
+    return value
+
+
 # =============================================================================
 # Utility Functions
 # =============================================================================
 
-def detect_risks() -> List[str]:
-    """Detect system risks."""
+def detect_risks(
+    sync_status: Optional[SyncStatus],
+    source_statuses: List[dict]
+) -> List[str]:
+    """Detect system risks from an already-fetched status snapshot."""
     risks = []
     
-    if not db or not scheduler:
-        return ["System not initialized"]
-    
-    sync_status = scheduler.get_sync_status()
     if sync_status:
         if not sync_status.forecast_healthy:
             risks.append("Forecast source unavailable")
         if not sync_status.alert_healthy:
             risks.append("Alert source unavailable")
     
-    source_statuses = db.get_system_status()
     for source in source_statuses:
         if source.get("consecutive_failures", 0) >= 3:
             risks.append(f"Source failing repeatedly: {source.get('source_name', 'unknown')}")
@@ -278,12 +327,19 @@ def detect_risks() -> List[str]:
     return risks
 
 
+def utc_timestamp() -> str:
+    """Current UTC time as ISO-8601, without building a datetime object."""
+    secs, nanos = divmod(time.time_ns(), 1_000_000_000)
+    return f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(secs))}.{nanos // 1000:06d}"
+
+
 def get_uptime() -> str:
     """Get formatted uptime string."""
-    if not start_time:
+    if start_time_ns is None:
         return "N/A"
-    delta = datetime.utcnow() - start_time
-    hours, remainder = divmod(int(delta.total_seconds()), 3600)
+    # Monotonic clock: uptime is unaffected by NTP steps of the wall clock
+    elapsed = (time.monotonic_ns() - start_time_ns) // 1_000_000_000
+    hours, remainder = divmod(elapsed, 3600)
     minutes, seconds = divmod(remainder, 60)
     return f"{hours}h {minutes}m {seconds}s"
 
@@ -292,58 +348,82 @@ def get_uptime() -> str:
 # API Endpoints - Info
 # =============================================================================
 
-@app.get("/", tags=["Info"])
+# Static payload, serialized once at import
+_ROOT_PAYLOAD = {
+    "name": "Romania Weather API",
+    "version": "2.0.0",
+    "description": "Weather data from ANM Romania",
+    "sources": {
+        "forecasts": "ANM XML - State-based city forecasts",
+        "alerts": "ANM RSS - Event-based weather warnings"
+    }
+}
+_ROOT_BODY = orjson.dumps(_ROOT_PAYLOAD)
+
+# Liveness probes may hit /health several times per second; answer them
+# from the result computed during the current second of the monotonic
+# clock (int(time.monotonic()) is the cache key)
+_health_cache: Tuple[int, Optional[HealthResponse]] = (0, None)
+
+
+@app.get("/", tags=["Info"], response_class=ORJSONResponse)
 async def root():
     """API information."""
-    return {
-        "name": "Romania Weather API",
-        "version": "2.0.0",
-        "description": "Weather data from ANM Romania",
-        "sources": {
-            "forecasts": "ANM XML - State-based city forecasts",
-            "alerts": "ANM RSS - Event-based weather warnings"
-        }
-    }
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
 async def health_check():
     """Health check endpoint."""
-    risks = detect_risks()
+    global _health_cache
     
-    return HealthResponse(
+    now = int(time.monotonic())
+    if _health_cache[0] == now and _health_cache[1] is not None:
+        return _health_cache[1]
+    
+    if not db or not scheduler:
+        risks = ["System not initialized"]
+    else:
+        source_statuses = await asyncio.to_thread(scheduler.get_source_status)
+        risks = detect_risks(scheduler.get_sync_status(), source_statuses)
+    
+    response = HealthResponse(
         status="healthy" if not risks else "degraded",
-        timestamp=datetime.utcnow().isoformat(),
+        timestamp=utc_timestamp(),
         database="connected" if db else "disconnected",
         scheduler="running" if scheduler and scheduler.is_running else "stopped",
         risks=risks
     )
+    _health_cache = (now, response)
+    return response
 
 
 # =============================================================================
 # API Endpoints - Cities & Forecasts
 # =============================================================================
 
-@app.get("/cities", tags=["Cities"])
+@app.get("/cities", tags=["Cities"], response_class=ORJSONResponse)
 async def get_cities():
     """Get list of all available Romanian cities."""
     if not db:
         raise HTTPException(status_code=503, detail="Database not available")
     
-    cities = db.get_all_cities()
+    cities = await cached_response(("cities",), CITIES_CACHE_TTL_SECONDS, db.get_all_cities)
     return {
         "cities": cities,
         "count": len(cities)
     }
 
 
-@app.get("/cities/search", tags=["Cities"])
+@app.get("/cities/search", tags=["Cities"], response_class=ORJSONResponse)
 async def search_cities(q: str = Query(..., min_length=1, description="Search query")):
     """Search cities by name prefix."""
     if not db:
         raise HTTPException(status_code=503, detail="Database not available")
     
-    cities = db.search_cities(q)
+    cities = await cached_response(
+        ("cities_search", q), CITIES_CACHE_TTL_SECONDS, lambda: db.search_cities(q)
+    )
     return {
         "query": q,
         "cities": cities,
@@ -357,35 +437,28 @@ async def get_city_forecast(city: str):
     if not db:
         raise HTTPException(status_code=503, detail="Database not available")
     
-    forecasts = db.get_city_forecast(city)
-    
-    if not forecasts:
-        # Try case-insensitive search
-        all_cities = db.get_all_cities()
-        matching = [c for c in all_cities if c.lower() == city.lower()]
-        if matching:
-            forecasts = db.get_city_forecast(matching[0])
+    forecasts = await asyncio.to_thread(db.get_city_forecast, city)
     
     if not forecasts:
         raise HTTPException(status_code=404, detail=f"No forecast found for city: {city}")
     
-    return [CityForecast(**f) for f in forecasts]
+    return [CityForecast.model_construct(**f) for f in forecasts]
 
 
-@app.get("/forecast", tags=["Forecasts"])
+@app.get("/forecast", tags=["Forecasts"], response_class=ORJSONResponse)
 async def get_default_forecast():
     """Get forecast for Bucharest (default city)."""
     if not db:
         raise HTTPException(status_code=503, detail="Database not available")
     
-    forecasts = db.get_city_forecast("Bucuresti")
+    forecasts = await asyncio.to_thread(db.get_city_forecast, "Bucuresti")
     
     if not forecasts:
         raise HTTPException(status_code=404, detail="Bucharest forecast not available")
     
     return {
         "city": "Bucuresti",
-        "forecasts": [CityForecast(**f) for f in forecasts]
+        "forecasts": [CityForecast.model_construct(**f) for f in forecasts]
     }
 
 
@@ -403,33 +476,33 @@ async def get_alerts(
         raise HTTPException(status_code=503, detail="Database not available")
     
     if level:
-        alerts = db.get_alerts_by_level(level.upper())
+        alerts = await asyncio.to_thread(db.get_alerts_by_level, level.upper())
     else:
-        alerts = db.get_active_alerts(limit)
+        alerts = await asyncio.to_thread(db.get_active_alerts, limit)
     
-    return [WeatherAlert(**a) for a in alerts]
+    return [WeatherAlert.model_construct(**a) for a in alerts]
 
 
-@app.get("/alerts/count", tags=["Alerts"])
+@app.get("/alerts/count", tags=["Alerts"], response_class=ORJSONResponse)
 async def get_alert_count():
     """Get count of active alerts by level."""
     if not db:
         raise HTTPException(status_code=503, detail="Database not available")
     
-    all_alerts = db.get_active_alerts(100)
-    
-    counts = {"YELLOW": 0, "ORANGE": 0, "RED": 0, "OTHER": 0}
-    for alert in all_alerts:
-        level = alert.get("alert_level", "OTHER")
-        if level in counts:
-            counts[level] += 1
-        else:
-            counts["OTHER"] += 1
+    def load_counts() -> dict:
+        counts = {"YELLOW": 0, "ORANGE": 0, "RED": 0, "OTHER": 0}
+        for level, count in db.get_alert_counts_by_level().items():
+            if level in counts:
+                counts[level] += count
+            else:
+                counts["OTHER"] += count
+        
+        return {
+            "total": sum(counts.values()),
+            "by_level": counts
+        }
     
-    return {
-        "total": len(all_alerts),
-        "by_level": counts
-    }
+    return await cached_response(("alert_counts",), ALERT_COUNT_CACHE_TTL_SECONDS, load_counts)
 
 
 # =============================================================================
@@ -442,13 +515,13 @@ async def get_system_status():
     if not db or not scheduler:
         raise HTTPException(status_code=503, detail="Service not initialized")
     
-    # Update Prometheus metrics
-    update_prometheus_metrics()
-    
     sync_status = scheduler.get_sync_status()
-    source_health = db.get_system_status()
-    data_summary = db.get_data_summary()
-    risks = detect_risks()
+    source_health = await asyncio.to_thread(scheduler.get_source_status)
+    data_summary = await asyncio.to_thread(db.get_data_summary)
+    risks = detect_risks(sync_status, source_health)
+    
+    # Update Prometheus metrics
+    update_prometheus_metrics(sync_status, source_health)
     
     # Determine overall status
     if not risks:
@@ -473,15 +546,20 @@ async def get_system_status():
     )
 
 
-@app.get("/sources", tags=["Status"])
+@app.get("/sources", tags=["Status"], response_class=ORJSONResponse)
 async def get_sources():
     """Get health status of data sources."""
     if not db:
         raise HTTPException(status_code=503, detail="Database not available")
     
+    sources = await asyncio.to_thread(
+        scheduler.get_source_status if scheduler else db.get_system_status
+    )
+    summary = await asyncio.to_thread(db.get_data_summary)
+    
     return {
-        "sources": db.get_system_status(),
-        "summary": db.get_data_summary()
+        "sources": sources,
+        "summary": summary
     }
 
 
@@ -496,8 +574,10 @@ async def trigger_fetch():
         raise HTTPException(status_code=503, detail="Scheduler not available")
     
     try:
-        results = scheduler.trigger_immediate_fetch()
-        return [FetchResultModel(**r.__dict__) for r in results]
+        # The sync blocks on HTTP and SQLite; run it off the event loop so
+        # concurrent read requests keep being served meanwhile
+        results = await asyncio.to_thread(scheduler.trigger_immediate_fetch)
+        return [FetchResultModel(**r.to_dict()) for r in results]
     except Exception as e:
         logger.error(f"Fetch error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -510,7 +590,7 @@ async def get_fetch_results():
         raise HTTPException(status_code=503, detail="Scheduler not available")
     
     results = scheduler.get_last_results()
-    return [FetchResultModel(**r.__dict__) for r in results]
+    return [FetchResultModel(**r.to_dict()) for r in results]
 
 
 if __name__ == "__main__":
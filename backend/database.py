@@ -10,7 +10,10 @@ Handles SQLite persistence with:
 import sqlite3
 import threading
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from contextlib import contextmanager
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 
@@ -18,6 +21,41 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_DB_PATH = Path(__file__).parent.parent / "weather.db"
 
+# Connection tuning
+CACHE_SIZE_KIB = 65536               # 64 MiB page cache
+MMAP_SIZE_BYTES = 256 * 1024 * 1024  # Serve reads from mapped pages
+WAL_AUTOCHECKPOINT_PAGES = 1000
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+
+# Most recent alert content hashes remembered in memory for duplicate skipping
+ALERT_HASH_CACHE_SIZE = 50_000
+
+# Forecast rows bound per executemany; callers may stream rows lazily
+FORECAST_INSERT_CHUNK = 1000
+
+# The in-memory active alert count is re-read from disk at least this often
+ALERT_COUNT_RESYNC_SECONDS = 3600
+
+# Columns returned by the hot read paths (match the API response models)
+_FORECAST_COLS = (
+    "id", "city", "forecast_date", "data_date", "temp_min", "temp_max",
+    "conditions", "conditions_code", "fetched_at",
+)
+_ALERT_COLS = (
+    "id", "title", "description", "published_at", "link", "alert_level",
+    "affected_zones", "time_range", "fetched_at",
+)
+_SOURCE_STATUS_COLS = (
+    "source_url", "source_type", "source_name", "last_fetch_at", "last_success_at",
+    "fetch_count", "success_count", "error_count", "last_error", "status",
+    "data_quality", "is_fresh", "avg_response_time_ms",
+    "last_response_time_ms", "consecutive_failures", "entries_count",
+    "reliability_percent",
+)
+_FORECAST_SELECT = ", ".join(_FORECAST_COLS)
+_ALERT_SELECT = ", ".join(_ALERT_COLS)
+
 
 class Database:
     """
@@ -25,34 +63,202 @@ class Database:
     
     Dependability features:
     - WAL mode for concurrent reads during writes
+    - Per-thread read-only connections; only writes are serialized
     - Automatic schema initialization
     - Data integrity through unique constraints
     - Source reliability tracking
     """
     
+    # Write-path statements, kept as constants so each is prepared once and
+    # then served from the connection's statement cache (keyed on the SQL
+    # text) for the process lifetime
+    _SQL_DELETE_FORECAST = """
+        DELETE FROM city_forecasts
+        WHERE city = ? AND forecast_date = ?
+    """
+    _SQL_INSERT_FORECAST = """
+        INSERT INTO city_forecasts
+        (city, forecast_date, data_date, temp_min, temp_max,
+         conditions, conditions_code, source_url, content_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    _SQL_INSERT_ALERT = """
+        INSERT OR IGNORE INTO weather_alerts
+        (title, description, published_at, link, alert_level,
+         affected_zones, time_range, source_url, content_hash, fetched_at_epoch)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CAST(strftime('%s', 'now') AS INTEGER))
+    """
+    # Integer comparison on the (is_active, fetched_at_epoch) index instead
+    # of parsing every row's TEXT fetched_at through datetime()
+    _SQL_DEACTIVATE_ALERTS = """
+        UPDATE weather_alerts
+        SET is_active = 0
+        WHERE is_active = 1
+        AND fetched_at_epoch < CAST(strftime('%s', 'now') AS INTEGER) - ? * 3600
+    """
+    _SQL_DELETE_PAST_FORECASTS = """
+        DELETE FROM city_forecasts
+        WHERE forecast_date < ?
+    """
+    _SQL_COUNT_ACTIVE_ALERTS = "SELECT COUNT(*) FROM weather_alerts WHERE is_active = 1"
+    _SQL_UPSERT_SOURCE_STATUS = """
+        INSERT INTO source_status 
+        (source_url, source_type, source_name, last_fetch_at, last_success_at, 
+         fetch_count, success_count, error_count, last_error, status, 
+         data_quality, is_fresh, avg_response_time_ms, last_response_time_ms, 
+         consecutive_failures, entries_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(source_url) DO UPDATE SET
+            source_type = excluded.source_type,
+            source_name = excluded.source_name,
+            last_fetch_at = excluded.last_fetch_at,
+            last_success_at = COALESCE(excluded.last_success_at, last_success_at),
+            fetch_count = fetch_count + excluded.fetch_count,
+            success_count = success_count + excluded.success_count,
+            error_count = error_count + excluded.error_count,
+            last_error = excluded.last_error,
+            status = excluded.status,
+            data_quality = excluded.data_quality,
+            is_fresh = excluded.is_fresh,
+            avg_response_time_ms = CASE WHEN COALESCE(fetch_count, 0) > 0
+                THEN (COALESCE(avg_response_time_ms, 0) * fetch_count
+                      + ?) / (fetch_count + excluded.fetch_count)
+                ELSE excluded.avg_response_time_ms END,
+            last_response_time_ms = excluded.last_response_time_ms,
+            consecutive_failures = CASE WHEN excluded.status = 'ok'
+                THEN 0 ELSE COALESCE(consecutive_failures, 0) + 1 END,
+            entries_count = excluded.entries_count
+    """
+    
     def __init__(self, db_path: str = None) -> None:
         self._db_path = db_path or str(DEFAULT_DB_PATH)
-        self._lock = threading.Lock()
+        # Re-entrant so transaction() blocks can call the write methods
+        self._write_lock = threading.RLock()
         self._conn = None
+        self._tls = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._cache_version = 0
+        self._invalidation_pending = False
+        self._write_errors = 0
+        # Write-side caches of stored content hashes, loaded lazily under
+        # _write_lock so unchanged rows never reach executemany
+        self._forecast_hashes: Optional[Dict[Tuple[str, str], Optional[bytes]]] = None
+        self._alert_hashes: Optional[Dict[bytes, None]] = None
+        # Active alert count kept current by the write paths; changes made
+        # inside a transaction are applied when it commits
+        self._active_alert_count: Optional[int] = None
+        self._alert_count_resync_at = 0.0
+        self._alert_count_delta = 0
         self._connect()
         self._init_schema()
         logger.info(f"Database initialized at {self._db_path}")
     
-    def _connect(self) -> None:
-        """Establish database connection with WAL mode."""
-        self._conn = sqlite3.connect(
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a connection with the shared performance PRAGMAs applied."""
+        conn = sqlite3.connect(
             self._db_path,
             check_same_thread=False,
-            isolation_level=None
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE
         )
-        self._conn.row_factory = sqlite3.Row
+        # Performance tuning for bulk ingest + read-heavy API
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE_BYTES}")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return conn
+    
+    def _connect(self) -> None:
+        """Establish the writer connection with WAL mode."""
+        self._conn = self._open_connection()
         self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL only syncs the WAL at checkpoints: a power loss may drop the
+        # last few commits, but never corrupts the database. Lost rows are
+        # refetched from ANM on the next poll.
         self._conn.execute("PRAGMA synchronous=NORMAL")
         self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.execute(f"PRAGMA wal_autocheckpoint={WAL_AUTOCHECKPOINT_PAGES}")
+    
+    def _reader(self) -> sqlite3.Connection:
+        """
+        Get the calling thread's read-only connection.
+        
+        WAL gives every reader a consistent snapshot even while the writer
+        is active, so reads do not need the write lock and API requests
+        served from different threads run in parallel.
+        """
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            conn = self._open_connection()
+            conn.execute("PRAGMA query_only=1")
+            self._tls.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """
+        Run the enclosed writes as one IMMEDIATE transaction.
+        
+        Caller must hold _write_lock. Commits on success; on any exception
+        the transaction is rolled back and the exception re-raised. Inside
+        an open transaction a SAVEPOINT is used instead, so only the nested
+        writes are undone.
+        """
+        if self._conn.in_transaction:
+            self._conn.execute("SAVEPOINT nested")
+            try:
+                yield
+                self._conn.execute("RELEASE nested")
+            except BaseException:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK TO nested")
+                    self._conn.execute("RELEASE nested")
+                raise
+            return
+        
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            self._conn.execute("COMMIT")
+        except BaseException:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            # Nested writes may have updated the hash caches
+            self._forecast_hashes = None
+            self._alert_hashes = None
+            self._active_alert_count = None
+            raise
+        finally:
+            delta, self._alert_count_delta = self._alert_count_delta, 0
+            if delta and self._active_alert_count is not None:
+                self._active_alert_count += delta
+            if self._invalidation_pending:
+                self._invalidation_pending = False
+                self.invalidate_caches()
+    
+    @contextmanager
+    def transaction(self) -> Iterator["Database"]:
+        """
+        Group several write methods into one commit.
+        
+        Holds the write lock for the whole block; write methods called
+        inside it join the transaction (each under its own savepoint).
+        Rolls everything back if the block raises.
+        
+        Example:
+            with db.transaction():
+                db.bulk_insert_forecasts(rows)
+                db.update_source_status(...)
+        """
+        with self._write_lock, self._transaction():
+            yield self
     
     def _init_schema(self) -> None:
         """Initialize database schema."""
-        with self._lock:
+        with self._write_lock:
             # City forecasts table (state-based data from XML)
             self._conn.execute("""
                 CREATE TABLE IF NOT EXISTS city_forecasts (
@@ -65,7 +271,7 @@ class Database:
                     conditions TEXT,
                     conditions_code TEXT,
                     source_url TEXT NOT NULL,
-                    content_hash TEXT NOT NULL,
+                    content_hash BLOB NOT NULL,
                     fetched_at TEXT NOT NULL DEFAULT (datetime('now')),
                     UNIQUE(city, forecast_date, content_hash)
                 )
@@ -83,11 +289,13 @@ class Database:
                     affected_zones TEXT,
                     time_range TEXT,
                     source_url TEXT NOT NULL,
-                    content_hash TEXT NOT NULL UNIQUE,
+                    content_hash BLOB NOT NULL UNIQUE,
                     fetched_at TEXT NOT NULL DEFAULT (datetime('now')),
+                    fetched_at_epoch INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
                     is_active INTEGER NOT NULL DEFAULT 1
                 )
             """)
+            self._migrate_alert_epoch()
             
             # Source status table for trustworthiness tracking
             self._conn.execute("""
@@ -117,18 +325,143 @@ class Database:
                 CREATE INDEX IF NOT EXISTS idx_forecast_city 
                 ON city_forecasts(city)
             """)
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_forecast_city_nocase
+                ON city_forecasts(city COLLATE NOCASE)
+            """)
             self._conn.execute("""
                 CREATE INDEX IF NOT EXISTS idx_forecast_date 
                 ON city_forecasts(forecast_date)
             """)
+            # Alert indexes match the filter + ORDER BY of the read paths so
+            # SQLite walks them in order instead of sorting
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_alert_level_active_pub
+                ON weather_alerts(alert_level, is_active, published_at DESC)
+            """)
             self._conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_alert_level 
-                ON weather_alerts(alert_level)
+                CREATE INDEX IF NOT EXISTS idx_alert_active_pub
+                ON weather_alerts(is_active, published_at DESC)
             """)
             self._conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_alert_active 
-                ON weather_alerts(is_active)
+                CREATE INDEX IF NOT EXISTS idx_alert_active_epoch
+                ON weather_alerts(is_active, fetched_at_epoch)
             """)
+            # Superseded by the composite indexes above
+            self._conn.execute("DROP INDEX IF EXISTS idx_alert_level")
+            self._conn.execute("DROP INDEX IF EXISTS idx_alert_active")
+            
+            # Refresh planner statistics
+            self._conn.execute("ANALYZE")
+    
+    def _migrate_alert_epoch(self) -> None:
+        """Add and backfill weather_alerts.fetched_at_epoch on older databases."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(weather_alerts)")}
+        if "fetched_at_epoch" in columns:
+            return
+        
+        # ALTER TABLE cannot take a non-constant default, so inserts supply
+        # the epoch explicitly and existing rows are backfilled here
+        self._conn.execute("ALTER TABLE weather_alerts ADD COLUMN fetched_at_epoch INTEGER")
+        self._conn.execute("""
+            UPDATE weather_alerts
+            SET fetched_at_epoch = CAST(strftime('%s', fetched_at) AS INTEGER)
+        """)
+        logger.info("Migrated weather_alerts: added fetched_at_epoch")
+    
+    # =========================================================================
+    # Cache Invalidation
+    # =========================================================================
+    
+    @property
+    def cache_version(self) -> int:
+        """Counter bumped whenever cached query results may be outdated."""
+        return self._cache_version
+    
+    @property
+    def write_errors(self) -> int:
+        """
+        Counter bumped whenever a write method swallows a database error.
+        
+        Compare readings taken inside one transaction() block to learn
+        whether the block's own writes were all stored.
+        """
+        return self._write_errors
+    
+    def invalidate_caches(self) -> None:
+        """
+        Invalidate results cached by callers (e.g. API response caches).
+        
+        Deferred to the commit while a transaction is open, so readers
+        never cache pre-commit data under the new version.
+        """
+        if self._conn.in_transaction:
+            self._invalidation_pending = True
+            return
+        self._cache_version += 1
+    
+    def _known_forecast_hashes(self) -> Dict[Tuple[str, str], Optional[bytes]]:
+        """
+        Map (city, forecast_date) to the content_hash of its stored row.
+        
+        None marks pairs holding several rows. Caller holds _write_lock.
+        """
+        if self._forecast_hashes is None:
+            self._forecast_hashes = {
+                (city, forecast_date): content_hash if count == 1 else None
+                for city, forecast_date, content_hash, count in self._conn.execute("""
+                    SELECT city, forecast_date, MAX(content_hash), COUNT(*)
+                    FROM city_forecasts
+                    GROUP BY city, forecast_date
+                """)
+            }
+        return self._forecast_hashes
+    
+    def _known_alert_hashes(self) -> Dict[bytes, None]:
+        """
+        Insertion-ordered set of recently stored alert content hashes.
+        
+        Alerts are never deleted, so a hit always means INSERT OR IGNORE
+        would skip the row; a miss just falls through to the database.
+        Caller holds _write_lock.
+        """
+        if self._alert_hashes is None:
+            rows = self._conn.execute(
+                "SELECT content_hash FROM weather_alerts ORDER BY id DESC LIMIT ?",
+                (ALERT_HASH_CACHE_SIZE,)
+            ).fetchall()
+            self._alert_hashes = dict.fromkeys(row[0] for row in reversed(rows))
+        return self._alert_hashes
+    
+    def is_known_alert(self, content_hash: bytes) -> bool:
+        """Whether an alert with this content hash is known to be stored."""
+        known = self._alert_hashes
+        if known is None:
+            with self._write_lock:
+                try:
+                    known = self._known_alert_hashes()
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to load alert hashes: {e}")
+                    return False
+        return content_hash in known
+    
+    def _adjust_alert_count(self, delta: int) -> None:
+        """Apply a change in active alerts once committed; caller holds _write_lock."""
+        if not delta:
+            return
+        if self._conn.in_transaction:
+            self._alert_count_delta += delta
+        elif self._active_alert_count is not None:
+            self._active_alert_count += delta
+    
+    def _remember_alert_hashes(self, rows: List[Tuple]) -> None:
+        """Record committed alert hashes, evicting the oldest past the cap."""
+        known = self._alert_hashes
+        if known is None:
+            return
+        known.update(dict.fromkeys(r[8] for r in rows))
+        while len(known) > ALERT_HASH_CACHE_SIZE:
+            del known[next(iter(known))]
     
     # =========================================================================
     # Forecast Operations (State-Based Data)
@@ -144,59 +477,183 @@ class Database:
         conditions: str,
         conditions_code: str,
         source_url: str,
-        content_hash: str
+        content_hash: bytes
     ) -> bool:
         """Insert or update a city forecast."""
-        with self._lock:
+        with self._write_lock:
             try:
                 # Delete old forecasts for this city/date combination
-                self._conn.execute("""
-                    DELETE FROM city_forecasts 
-                    WHERE city = ? AND forecast_date = ?
-                """, (city, forecast_date))
+                self._conn.execute(
+                    self._SQL_DELETE_FORECAST, (city, forecast_date)
+                )
                 
-                self._conn.execute("""
-                    INSERT INTO city_forecasts 
-                    (city, forecast_date, data_date, temp_min, temp_max, 
-                     conditions, conditions_code, source_url, content_hash)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (city, forecast_date, data_date, temp_min, temp_max,
-                      conditions, conditions_code, source_url, content_hash))
+                self._conn.execute(self._SQL_INSERT_FORECAST, (
+                    city, forecast_date, data_date, temp_min, temp_max,
+                    conditions, conditions_code, source_url, content_hash
+                ))
+                if self._forecast_hashes is not None:
+                    self._forecast_hashes[(city, forecast_date)] = content_hash
                 return True
             except sqlite3.Error as e:
                 logger.error(f"Failed to insert forecast: {e}")
+                self._write_errors += 1
                 return False
     
+    def bulk_insert_forecasts(self, rows: Iterable[Tuple]) -> int:
+        """
+        Insert or update many city forecasts in a single transaction.
+        
+        Replaces existing entries for each (city, forecast_date) pair, so a
+        whole ANM ingest costs one commit instead of one per row. When a
+        pair repeats, the last row wins. Rows whose content_hash matches
+        the stored row are skipped.
+        
+        Rows are consumed FORECAST_INSERT_CHUNK at a time, so a generator
+        can feed them without the whole row list ever being materialized.
+        A chunk the database rejects is retried row by row, and only the
+        offending rows are dropped.
+        
+        Args:
+            rows: Positional tuples in insert_forecast() argument order
+                (city, forecast_date, data_date, temp_min, temp_max,
+                conditions, conditions_code, source_url, content_hash)
+        
+        Returns:
+            Number of forecasts written (0 if the transaction was rolled back)
+        """
+        rows = iter(rows)
+        written = 0
+        
+        with self._write_lock:
+            try:
+                known = self._known_forecast_hashes()
+                # Hash now stored for each pair this batch wrote
+                batch_hashes: Dict[Tuple[str, str], bytes] = {}
+                
+                with self._transaction():
+                    while True:
+                        chunk = list(islice(rows, FORECAST_INSERT_CHUNK))
+                        if not chunk:
+                            break
+                        
+                        # Last row per pair; deleting each pair before its
+                        # insert also replaces rows an earlier chunk wrote
+                        latest = {r[:2]: r for r in chunk}
+                        inserts = [
+                            r for key, r in latest.items()
+                            if batch_hashes.get(key, known.get(key)) != r[8]
+                        ]
+                        if not inserts:
+                            continue
+                        
+                        try:
+                            with self._transaction():
+                                self._conn.executemany(
+                                    self._SQL_DELETE_FORECAST, [r[:2] for r in inserts]
+                                )
+                                self._conn.executemany(self._SQL_INSERT_FORECAST, inserts)
+                        except sqlite3.Error as e:
+                            logger.warning(f"Forecast chunk rejected ({e}), retrying row by row")
+                            inserts = [r for r in inserts if self._insert_forecast_row(r)]
+                        
+                        for r in inserts:
+                            batch_hashes[r[:2]] = r[8]
+                        written += len(inserts)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to bulk insert forecasts: {e}")
+                self._write_errors += 1
+                return 0
+            if written:
+                known.update(batch_hashes)
+                self.invalidate_caches()
+            return written
+    
+    def _insert_forecast_row(self, row: Tuple) -> bool:
+        """
+        Replace one forecast row under its own savepoint.
+        
+        Caller holds _write_lock inside an open transaction. Returns False
+        (with the row's pair left untouched) if the database rejects it.
+        """
+        try:
+            with self._transaction():
+                self._conn.execute(self._SQL_DELETE_FORECAST, row[:2])
+                self._conn.execute(self._SQL_INSERT_FORECAST, row)
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Skipping forecast {row[0]} {row[1]}: {e}")
+            self._write_errors += 1
+            return False
+    
     def get_city_forecast(self, city: str) -> List[Dict[str, Any]]:
-        """Get forecasts for a specific city (only current and future dates)."""
-        with self._lock:
-            today = datetime.utcnow().strftime("%Y-%m-%d")
-            cursor = self._conn.execute("""
-                SELECT * FROM city_forecasts
-                WHERE city = ? AND forecast_date >= ?
-                ORDER BY forecast_date ASC
-            """, (city, today))
-            return [dict(row) for row in cursor.fetchall()]
+        """
+        Get forecasts for a specific city (only current and future dates).
+        
+        City names are matched case-insensitively.
+        """
+        conn = self._reader()
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        cursor = conn.execute(f"""
+            SELECT {_FORECAST_SELECT} FROM city_forecasts
+            WHERE city = ? COLLATE NOCASE AND forecast_date >= ?
+            ORDER BY forecast_date ASC
+        """, (city, today))
+        return [dict(zip(_FORECAST_COLS, row)) for row in cursor.fetchall()]
     
     def get_all_cities(self) -> List[str]:
         """Get list of all cities with forecasts."""
-        with self._lock:
-            cursor = self._conn.execute("""
-                SELECT DISTINCT city FROM city_forecasts
-                ORDER BY city ASC
-            """)
-            return [row[0] for row in cursor.fetchall()]
+        conn = self._reader()
+        # GROUP BY walks idx_forecast_city in order; no DISTINCT temp b-tree
+        cursor = conn.execute("""
+            SELECT city FROM city_forecasts
+            GROUP BY city
+            ORDER BY city ASC
+        """)
+        return [row[0] for row in cursor.fetchall()]
     
     def search_cities(self, query: str) -> List[str]:
-        """Search cities by name prefix."""
-        with self._lock:
-            cursor = self._conn.execute("""
-                SELECT DISTINCT city FROM city_forecasts
-                WHERE city LIKE ?
+        """Search cities by name prefix (ASCII case-insensitive, like LIKE)."""
+        if not query:
+            return self.get_all_cities()[:20]
+        
+        # Prefix match as a NOCASE range on idx_forecast_city_nocase instead
+        # of a per-row LIKE pattern. NOCASE folds ASCII only, so fold the
+        # bounds the same way before bumping the last character.
+        low = query.encode("utf-8").lower().decode("utf-8")
+        high = self._prefix_upper_bound(low)
+        conn = self._reader()
+        if high is None:
+            cursor = conn.execute("""
+                SELECT city FROM city_forecasts
+                WHERE city COLLATE NOCASE >= ?
+                GROUP BY city
+                ORDER BY city ASC
+                LIMIT 20
+            """, (low,))
+        else:
+            cursor = conn.execute("""
+                SELECT city FROM city_forecasts
+                WHERE city COLLATE NOCASE >= ? AND city COLLATE NOCASE < ?
+                GROUP BY city
                 ORDER BY city ASC
                 LIMIT 20
-            """, (f"{query}%",))
-            return [row[0] for row in cursor.fetchall()]
+            """, (low, high))
+        return [row[0] for row in cursor.fetchall()]
+    
+    @staticmethod
+    def _prefix_upper_bound(prefix: str) -> Optional[str]:
+        """
+        Smallest string above every string starting with prefix.
+        
+        Bumps the last character below U+10FFFF to the next code point that
+        SQLite can bind (skipping the surrogates), dropping any U+10FFFF
+        after it; None if there is none, so the range has no upper bound.
+        """
+        for i in range(len(prefix) - 1, -1, -1):
+            code = ord(prefix[i]) + 1
+            if code <= 0x10FFFF:
+                return prefix[:i] + chr(0xE000 if 0xD800 <= code <= 0xDFFF else code)
+        return None
     
     # =========================================================================
     # Alert Operations (Event-Based Data)
@@ -212,75 +669,161 @@ class Database:
         affected_zones: Optional[str],
         time_range: Optional[str],
         source_url: str,
-        content_hash: str
+        content_hash: bytes
     ) -> bool:
         """Insert a weather alert if not duplicate."""
-        with self._lock:
+        return self.bulk_insert_alerts([(
+            title, description, published_at, link, alert_level,
+            affected_zones, time_range, source_url, content_hash
+        )]) > 0
+    
+    def bulk_insert_alerts(self, rows: List[Tuple]) -> int:
+        """
+        Insert many weather alerts in a single transaction, skipping duplicates.
+        
+        Args:
+            rows: Positional tuples in insert_alert() argument order
+                (title, description, published_at, link, alert_level,
+                affected_zones, time_range, source_url, content_hash)
+        
+        Returns:
+            Number of alerts actually inserted (duplicates are not counted)
+        """
+        if not rows:
+            return 0
+        
+        with self._write_lock:
             try:
-                self._conn.execute("""
-                    INSERT OR IGNORE INTO weather_alerts 
-                    (title, description, published_at, link, alert_level,
-                     affected_zones, time_range, source_url, content_hash)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (title, description, published_at, link, alert_level,
-                      affected_zones, time_range, source_url, content_hash))
-                
-                cursor = self._conn.execute("SELECT changes()")
-                return cursor.fetchone()[0] > 0
+                known = self._known_alert_hashes()
+                rows = [r for r in rows if r[8] not in known]
+                if not rows:
+                    return 0
+                with self._transaction():
+                    inserted = self._insert_alert_rows(rows)
             except sqlite3.Error as e:
-                logger.error(f"Failed to insert alert: {e}")
-                return False
+                logger.error(f"Failed to bulk insert alerts: {e}")
+                self._write_errors += 1
+                return 0
+            self._remember_alert_hashes(rows)
+            self._adjust_alert_count(inserted)
+            if inserted > 0:
+                self.invalidate_caches()
+            return inserted
+    
+    def ingest_alerts(
+        self,
+        rows: List[Tuple],
+        deactivate_hours: int = 24
+    ) -> Tuple[int, int]:
+        """
+        Expire stale alerts and insert a fresh batch in one transaction.
+        
+        Folds deactivate_old_alerts() and bulk_insert_alerts() into a single
+        commit, so each RSS ingest cycle costs one WAL sync instead of two.
+        Rows use the bulk_insert_alerts() tuple layout.
+        
+        Returns:
+            (inserted, deactivated) counts; (0, 0) if the transaction was rolled back
+        """
+        with self._write_lock:
+            try:
+                known = self._known_alert_hashes()
+                rows = [r for r in rows if r[8] not in known]
+                with self._transaction():
+                    deactivated = self._conn.execute(
+                        self._SQL_DEACTIVATE_ALERTS, (deactivate_hours,)
+                    ).rowcount
+                    inserted = self._insert_alert_rows(rows) if rows else 0
+            except sqlite3.Error as e:
+                logger.error(f"Failed to ingest alerts: {e}")
+                self._write_errors += 1
+                return 0, 0
+            self._remember_alert_hashes(rows)
+            self._adjust_alert_count(inserted - deactivated)
+            if inserted > 0 or deactivated > 0:
+                self.invalidate_caches()
+            return inserted, deactivated
+    
+    def _insert_alert_rows(self, rows: List[Tuple]) -> int:
+        """Run the alert INSERT OR IGNORE batch; caller holds the write transaction."""
+        before = self._conn.total_changes
+        self._conn.executemany(self._SQL_INSERT_ALERT, rows)
+        return self._conn.total_changes - before
     
     def get_active_alerts(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Get active weather alerts."""
-        with self._lock:
-            cursor = self._conn.execute("""
-                SELECT * FROM weather_alerts
-                WHERE is_active = 1
-                ORDER BY published_at DESC
-                LIMIT ?
-            """, (limit,))
-            return [dict(row) for row in cursor.fetchall()]
+        conn = self._reader()
+        cursor = conn.execute(f"""
+            SELECT {_ALERT_SELECT} FROM weather_alerts
+            WHERE is_active = 1
+            ORDER BY published_at DESC
+            LIMIT ?
+        """, (limit,))
+        return [dict(zip(_ALERT_COLS, row)) for row in cursor.fetchall()]
     
     def get_alerts_by_level(self, level: str) -> List[Dict[str, Any]]:
         """Get alerts filtered by level (YELLOW, ORANGE, RED)."""
-        with self._lock:
-            cursor = self._conn.execute("""
-                SELECT * FROM weather_alerts
-                WHERE alert_level = ? AND is_active = 1
-                ORDER BY published_at DESC
-            """, (level,))
-            return [dict(row) for row in cursor.fetchall()]
+        conn = self._reader()
+        cursor = conn.execute(f"""
+            SELECT {_ALERT_SELECT} FROM weather_alerts
+            WHERE alert_level = ? AND is_active = 1
+            ORDER BY published_at DESC
+        """, (level,))
+        return [dict(zip(_ALERT_COLS, row)) for row in cursor.fetchall()]
     
     def get_alert_count(self) -> int:
-        """Get total active alert count."""
-        with self._lock:
-            cursor = self._conn.execute(
-                "SELECT COUNT(*) FROM weather_alerts WHERE is_active = 1"
-            )
-            return cursor.fetchone()[0]
+        """
+        Get total active alert count.
+        
+        Served from a counter the write paths keep current; the COUNT(*)
+        only runs on first use and every ALERT_COUNT_RESYNC_SECONDS.
+        """
+        count = self._active_alert_count
+        if count is not None and time.monotonic() < self._alert_count_resync_at:
+            return count
+        
+        # Count on the writer so no commit can land between the read and
+        # storing the result
+        with self._write_lock:
+            count = self._conn.execute(self._SQL_COUNT_ACTIVE_ALERTS).fetchone()[0]
+            if not self._conn.in_transaction:
+                self._active_alert_count = count
+                self._alert_count_resync_at = time.monotonic() + ALERT_COUNT_RESYNC_SECONDS
+        return count
+    
+    def get_alert_counts_by_level(self) -> Dict[str, int]:
+        """Get active alert counts grouped by level (NULL level as OTHER)."""
+        conn = self._reader()
+        cursor = conn.execute("""
+            SELECT COALESCE(alert_level, 'OTHER') AS lvl, COUNT(*)
+            FROM weather_alerts
+            WHERE is_active = 1
+            GROUP BY lvl
+        """)
+        return {row[0]: row[1] for row in cursor.fetchall()}
     
     def deactivate_old_alerts(self, hours: int = 24) -> int:
         """Deactivate alerts older than specified hours."""
-        with self._lock:
-            cursor = self._conn.execute("""
-                UPDATE weather_alerts
-                SET is_active = 0
-                WHERE is_active = 1 
-                AND datetime(fetched_at) < datetime('now', ?)
-            """, (f"-{hours} hours",))
+        with self._write_lock:
+            cursor = self._conn.execute(self._SQL_DEACTIVATE_ALERTS, (hours,))
+            self._adjust_alert_count(-cursor.rowcount)
+            if cursor.rowcount > 0:
+                self.invalidate_caches()
             return cursor.rowcount
     
     def cleanup_old_forecasts(self) -> int:
         """Remove forecasts with dates in the past."""
-        with self._lock:
+        with self._write_lock:
             today = datetime.utcnow().strftime("%Y-%m-%d")
-            cursor = self._conn.execute("""
-                DELETE FROM city_forecasts
-                WHERE forecast_date < ?
-            """, (today,))
+            cursor = self._conn.execute(self._SQL_DELETE_PAST_FORECASTS, (today,))
             deleted = cursor.rowcount
             if deleted > 0:
+                if self._forecast_hashes is not None:
+                    self._forecast_hashes = {
+                        key: value for key, value in self._forecast_hashes.items()
+                        if key[1] >= today
+                    }
+                self.invalidate_caches()
                 logger.info(f"Cleaned up {deleted} old forecast entries")
             return deleted
     
@@ -298,110 +841,79 @@ class Database:
         is_fresh: bool,
         entries_count: int = 0,
         error_message: Optional[str] = None,
-        response_time_ms: int = 0
+        response_time_ms: int = 0,
+        fetches: int = 1,
+        total_response_time_ms: Optional[int] = None,
+        fetched_at: Optional[str] = None
     ) -> None:
-        """Update source status for trustworthiness tracking."""
-        with self._lock:
-            now = datetime.utcnow().isoformat()
+        """
+        Update source status for trustworthiness tracking.
+        
+        A single UPSERT: the running average and failure streak are computed
+        by SQLite from the stored row, so there is no read-modify-write.
+        `fetches` > 1 records that many identical polls at once, with
+        `total_response_time_ms` their summed response time and
+        `fetched_at` the time of the last one.
+        """
+        with self._write_lock:
+            now = fetched_at or datetime.utcnow().isoformat()
             status = "ok" if success else "error"
+            if total_response_time_ms is None:
+                total_response_time_ms = response_time_ms
             
-            cursor = self._conn.execute(
-                "SELECT fetch_count, avg_response_time_ms, consecutive_failures FROM source_status WHERE source_url = ?",
-                (source_url,)
-            )
-            existing = cursor.fetchone()
-            
-            if existing:
-                fetch_count = existing[0] or 0
-                old_avg = existing[1] or 0
-                old_failures = existing[2] or 0
-                
-                new_avg = int((old_avg * fetch_count + response_time_ms) / (fetch_count + 1)) if fetch_count > 0 else response_time_ms
-                consecutive_failures = 0 if success else (old_failures + 1)
-                
-                self._conn.execute("""
-                    UPDATE source_status SET
-                        source_type = ?,
-                        source_name = ?,
-                        last_fetch_at = ?,
-                        last_success_at = CASE WHEN ? THEN ? ELSE last_success_at END,
-                        fetch_count = fetch_count + 1,
-                        success_count = success_count + CASE WHEN ? THEN 1 ELSE 0 END,
-                        error_count = error_count + CASE WHEN ? THEN 0 ELSE 1 END,
-                        last_error = CASE WHEN ? THEN NULL ELSE ? END,
-                        status = ?,
-                        data_quality = ?,
-                        is_fresh = ?,
-                        avg_response_time_ms = ?,
-                        last_response_time_ms = ?,
-                        consecutive_failures = ?,
-                        entries_count = ?
-                    WHERE source_url = ?
-                """, (
-                    source_type, source_name, now, success, now, success, success,
-                    success, error_message, status, data_quality, 
-                    1 if is_fresh else 0, new_avg, response_time_ms,
-                    consecutive_failures, entries_count, source_url
-                ))
-            else:
-                self._conn.execute("""
-                    INSERT INTO source_status 
-                    (source_url, source_type, source_name, last_fetch_at, last_success_at, 
-                     fetch_count, success_count, error_count, last_error, status, 
-                     data_quality, is_fresh, avg_response_time_ms, last_response_time_ms, 
-                     consecutive_failures, entries_count)
-                    VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    source_url, source_type, source_name, now, 
-                    now if success else None,
-                    1 if success else 0, 0 if success else 1, error_message,
-                    status, data_quality, 1 if is_fresh else 0,
-                    response_time_ms, response_time_ms, 0 if success else 1, entries_count
-                ))
+            self._conn.execute(self._SQL_UPSERT_SOURCE_STATUS, (
+                source_url, source_type, source_name, now, 
+                now if success else None,
+                fetches, fetches if success else 0, 0 if success else fetches,
+                None if success else error_message,
+                status, data_quality, 1 if is_fresh else 0,
+                total_response_time_ms // fetches, response_time_ms,
+                0 if success else 1, entries_count, total_response_time_ms
+            ))
     
     def get_system_status(self) -> List[Dict[str, Any]]:
         """Get status of all feed sources."""
-        with self._lock:
-            cursor = self._conn.execute("""
-                SELECT 
-                    source_url, source_type, source_name, last_fetch_at, last_success_at,
-                    fetch_count, success_count, error_count, last_error, status,
-                    data_quality, is_fresh, avg_response_time_ms, 
-                    last_response_time_ms, consecutive_failures, entries_count,
-                    CASE WHEN fetch_count > 0 
-                         THEN ROUND(CAST(success_count AS FLOAT) / fetch_count * 100, 1)
-                         ELSE 0 END as reliability_percent
-                FROM source_status
-                ORDER BY source_type, source_url
-            """)
-            return [dict(row) for row in cursor.fetchall()]
+        conn = self._reader()
+        cursor = conn.execute("""
+            SELECT 
+                source_url, source_type, source_name, last_fetch_at, last_success_at,
+                fetch_count, success_count, error_count, last_error, status,
+                data_quality, is_fresh, avg_response_time_ms, 
+                last_response_time_ms, consecutive_failures, entries_count,
+                CASE WHEN fetch_count > 0 
+                     THEN ROUND(CAST(success_count AS FLOAT) / fetch_count * 100, 1)
+                     ELSE 0 END as reliability_percent
+            FROM source_status
+            ORDER BY source_type, source_url
+        """)
+        return [dict(zip(_SOURCE_STATUS_COLS, row)) for row in cursor.fetchall()]
     
     def get_data_summary(self) -> Dict[str, Any]:
         """Get summary of all data in database."""
-        with self._lock:
-            forecast_count = self._conn.execute(
-                "SELECT COUNT(*) FROM city_forecasts"
-            ).fetchone()[0]
-            
-            alert_count = self._conn.execute(
-                "SELECT COUNT(*) FROM weather_alerts WHERE is_active = 1"
-            ).fetchone()[0]
-            
-            city_count = self._conn.execute(
-                "SELECT COUNT(DISTINCT city) FROM city_forecasts"
-            ).fetchone()[0]
-            
-            return {
-                "forecast_entries": forecast_count,
-                "alert_entries": alert_count,
-                "city_count": city_count,
-                "total_entries": forecast_count + alert_count
-            }
+        conn = self._reader()
+        forecast_count, alert_count, city_count = conn.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM city_forecasts),
+                (SELECT COUNT(*) FROM weather_alerts WHERE is_active = 1),
+                (SELECT COUNT(DISTINCT city) FROM city_forecasts)
+        """).fetchone()
+        
+        return {
+            "forecast_entries": forecast_count,
+            "alert_entries": alert_count,
+            "city_count": city_count,
+            "total_entries": forecast_count + alert_count
+        }
     
     def close(self) -> None:
-        """Close database connection."""
-        with self._lock:
+        """Close writer and reader connections."""
+        with self._write_lock:
+            with self._readers_lock:
+                for reader in self._readers:
+                    reader.close()
+                self._readers.clear()
+            self._tls = threading.local()
             if self._conn:
                 self._conn.close()
                 self._conn = None
-                logger.info("Database connection closed")
+                logger.info("Database connection closed")
\ No newline at end of file
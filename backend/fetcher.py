@@ -12,37 +12,141 @@ Demonstrates dependability through:
 - Fault tolerance (retry mechanism, graceful degradation)
 """
 
+import codecs
 import hashlib
 import html
+import io
 import logging
 import re
-import xml.etree.ElementTree as ET
-from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass, field
-from datetime import datetime, timedelta
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from enum import Enum
+from functools import lru_cache
+from html.entities import name2codepoint
+from itertools import repeat
 
-import feedparser
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+# libxml2-backed parsing when available; the stdlib API is a drop-in fallback
+try:
+    from lxml import etree as ET
+    _HAS_LXML = True
+except ImportError:  # pragma: no cover
+    import xml.etree.ElementTree as ET
+    _HAS_LXML = False
+
 logger = logging.getLogger(__name__)
 
 # Configuration constants
 DEFAULT_TIMEOUT = 15  # seconds
+CONNECT_TIMEOUT = 5   # seconds; fail fast when the host is unreachable
 MAX_RETRIES = 3
 RETRY_BACKOFF = 0.5
 USER_AGENT = "WeatherRSSFetcher/1.0 (Educational Project - Dependable Systems)"
+HTTP_POOL_SIZE = 4  # Pooled keep-alive connections per host
+
+# Pre-initialized dedup hash state; copy() skips parameter setup per call
+_HASH_PROTO = hashlib.blake2b(digest_size=16)
+
+# Forecast temperatures (whole degrees C) fit a signed byte: -128..127
+TEMP_ARRAY_TYPE = "b"
 
 # Freshness thresholds (how old data can be before considered stale)
 FORECAST_FRESHNESS_HOURS = 12  # XML forecasts update once or twice daily
 ALERT_FRESHNESS_HOURS = 1      # Alerts should be near real-time
 
+# The RSS feed lists newest items first: after this many consecutive
+# already-stored alerts the rest of the feed is assumed to be stored too
+KNOWN_ALERT_STREAK = 3
+
 # ANM Data Sources
 ANM_FORECAST_XML_URL = "http://www.meteoromania.ro/anm/prognoza-orase-xml.php"
 ANM_ALERTS_RSS_URL = "http://www.meteoromania.ro/anm2/avertizari-rss.php"
 
+# Alert text patterns, compiled once at import
+_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s+')
+_COD_RE = re.compile(r'COD\s*:\s*(\w+)', re.IGNORECASE)
+# Captures are bounded greedy runs (no lazy scan-to-terminator, so no
+# backtracking across long bulletins); terminators are cut in Python
+_ZONE_SCAN_CHARS = 400
+_DESC_SCAN_CHARS = 600
+_ZONE_RE = re.compile(r'In zona\s*:\s*(.{1,%d})' % _ZONE_SCAN_CHARS)
+_TIME_RE = re.compile(r'Intre orele\s*:\s*([\d:]+)\s*si\s*([\d:]+)')
+_FORMAT_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in (
+        # "Se vor semnala: ..." (nowcast alerts)
+        r'Se vor semnala\s*:\s*(.{1,%d})' % _DESC_SCAN_CHARS,
+        # "Fenomene vizate: ..." (meteorological bulletins)
+        r'Fenomene vizate\s*:\s*(.{1,%d})' % _DESC_SCAN_CHARS,
+        # Just the phenomena after all the metadata
+        r'Fenomene\s*:\s*conform textelor\s+Mesaj\s*:\s*(.{1,%d})' % _DESC_SCAN_CHARS,
+    )
+]
+_TRAILING_META_RE = re.compile(r'\s*Interval de valabilitate.*$', re.IGNORECASE)
+_MESAJ_RE = re.compile(
+    r'Mesaj\s*:\s*(?:MESAJ\s*\d+/\d+\s*)?(.{1,%d})' % _DESC_SCAN_CHARS, re.IGNORECASE
+)
+_VALIDITY_RE = re.compile(r'Interval de valabilitate', re.IGNORECASE)
+# All description markers in one alternation; group N is _FORMAT_PATTERNS[N-1],
+# the last group is the _MESAJ_RE fallback. Lookaheads keep the match to the
+# marker word so a "Mesaj" nested in group 3 is still seen by the scan.
+_DESC_MARKER_RE = re.compile(
+    r'(?:(Se vor semnala)|(Fenomene vizate))(?=\s*:)'
+    r'|(Fenomene)(?=\s*:\s*conform textelor\s+Mesaj\s*:)'
+    r'|(Mesaj)(?=\s*:)',
+    re.IGNORECASE
+)
+_DESC_FALLBACK_GROUP = len(_FORMAT_PATTERNS) + 1
+
+# Named HTML entities (e.g. &icirc;) are undeclared in XML: the strict
+# parser rejects them and lxml's recovery truncates the text around them,
+# so they are rewritten to character references (unknown names are kept
+# as literal text) before parsing. CDATA sections are matched whole and
+# left untouched.
+_XML_ENTITIES = frozenset(("amp", "lt", "gt", "quot", "apos"))
+_HTML_ENTITY_RE = re.compile(rb'<!\[CDATA\[.*?\]\]>|&([A-Za-z][A-Za-z0-9]{1,31});', re.DOTALL)
+
+# Romanian -> English weather conditions (output order follows this table)
+_TRANSLATIONS = {
+    "CER SENIN": "Clear Sky",
+    "CER VARIABIL": "Partly Cloudy",
+    "CER PARTIAL NOROS": "Partly Cloudy",
+    "CER MAI MULT NOROS": "Mostly Cloudy",
+    "CER NOROS": "Cloudy",
+    "INNNORAT": "Overcast",
+    "PLOAIE SLABA": "Light Rain",
+    "PLOAIE": "Rain",
+    "PLOAIE MODERATA": "Moderate Rain",
+    "PLOI": "Rainy",
+    "AVERSE": "Showers",
+    "FURTUNA": "Thunderstorm",
+    "NINSOARE SLABA": "Light Snow",
+    "NINSOARE": "Snow",
+    "NINSOARE MODERATA": "Moderate Snow",
+    "LAPOVITA": "Sleet",
+    "CEATA": "Fog",
+    "BURNITA": "Drizzle",
+}
+# One scan finds the longest term starting at each position (zero-width, so
+# overlapping terms are all seen); shorter terms that are a prefix of it,
+# e.g. PLOAIE inside PLOAIE SLABA, are implied by that match.
+_COND_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, sorted(_TRANSLATIONS, key=len, reverse=True))) + "))"
+)
+_COND_PREFIXES = {
+    term: [other for other in _TRANSLATIONS if term.startswith(other)]
+    for term in _TRANSLATIONS
+}
+_ALERT_LEVELS = {"GALBEN": "YELLOW", "PORTOCALIU": "ORANGE", "ROSU": "RED"}
+
 
 class SourceType(Enum):
     """Classification of data source types for synchronization."""
@@ -59,7 +163,7 @@ class DataQuality(Enum):
     UNAVAILABLE = "unavailable"  # Source unreachable
 
 
-@dataclass
+@dataclass(slots=True)
 class CityForecast:
     """Represents a structured forecast for a specific city and date."""
     city: str
@@ -70,11 +174,74 @@ class CityForecast:
     conditions: str         # Weather description in Romanian
     conditions_code: str    # Symbol/code for the weather condition
     source_url: str
-    content_hash: str
+    content_hash: bytes     # Raw 16-byte BLAKE2b digest
     fetched_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
 
 
-@dataclass
+@dataclass(slots=True)
+class ForecastBatch:
+    """
+    Column-oriented (struct-of-arrays) form of one forecast fetch.
+    
+    Index i across all columns is one forecast. Temperatures are packed
+    into typed arrays so aggregations walk contiguous machine integers
+    instead of boxed Python ints.
+    """
+    cities: List[str] = field(default_factory=list)
+    forecast_dates: List[str] = field(default_factory=list)
+    data_dates: List[str] = field(default_factory=list)
+    temp_min: array = field(default_factory=lambda: array(TEMP_ARRAY_TYPE))
+    temp_max: array = field(default_factory=lambda: array(TEMP_ARRAY_TYPE))
+    conditions: List[str] = field(default_factory=list)
+    conditions_code: List[str] = field(default_factory=list)
+    content_hashes: List[bytes] = field(default_factory=list)
+    source_url: str = ANM_FORECAST_XML_URL
+    
+    def __len__(self) -> int:
+        return len(self.cities)
+    
+    def to_forecasts(self) -> List[CityForecast]:
+        """Expand into one CityForecast per entry (array-of-structs form)."""
+        return [
+            CityForecast(
+                city=city,
+                forecast_date=forecast_date,
+                data_date=data_date,
+                temp_min=temp_min,
+                temp_max=temp_max,
+                conditions=conditions,
+                conditions_code=conditions_code,
+                source_url=self.source_url,
+                content_hash=content_hash
+            )
+            for city, forecast_date, data_date, temp_min, temp_max,
+                conditions, conditions_code, content_hash in zip(
+                    self.cities, self.forecast_dates, self.data_dates,
+                    self.temp_min, self.temp_max, self.conditions,
+                    self.conditions_code, self.content_hashes
+                )
+        ]
+    
+    def iter_rows(self) -> Iterator[Tuple]:
+        """
+        Lazily zip the columns into Database.bulk_insert_forecasts() row tuples.
+        
+        Goes straight from columns to bound parameters, without building
+        a CityForecast (or a row list) per entry.
+        """
+        return zip(
+            self.cities, self.forecast_dates, self.data_dates,
+            self.temp_min, self.temp_max, self.conditions,
+            self.conditions_code, repeat(self.source_url, len(self.cities)),
+            self.content_hashes
+        )
+    
+    def to_rows(self) -> List[Tuple]:
+        """All rows of iter_rows() as a list."""
+        return list(self.iter_rows())
+
+
+@dataclass(slots=True)
 class WeatherAlert:
     """Represents a weather alert/warning from RSS."""
     title: str
@@ -85,11 +252,11 @@ class WeatherAlert:
     affected_zones: Optional[str]
     time_range: Optional[str]
     source_url: str
-    content_hash: str
+    content_hash: bytes     # Raw 16-byte BLAKE2b digest
     fetched_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
 
 
-@dataclass
+@dataclass(slots=True)
 class FetchMetadata:
     """Metadata about a fetch operation for trustworthiness tracking."""
     source_url: str
@@ -103,6 +270,8 @@ class FetchMetadata:
     data_quality: DataQuality
     is_fresh: bool
     last_modified: Optional[str]
+    not_modified: bool = False  # 304 or identical body: entries are the previous payload's
+    payload_hash: Optional[bytes] = None  # SHA-256 of the raw response body
 
 
 class FetchError(Exception):
@@ -115,6 +284,38 @@ class ValidationError(Exception):
     pass
 
 
+class NotModified(Exception):
+    """Raised by a conditional GET answered with 304 Not Modified."""
+    
+    def __init__(self, response_time_ms: int):
+        super().__init__("Source not modified since last fetch")
+        self.response_time_ms = response_time_ms
+
+
+@lru_cache(maxsize=512)
+def _translate_conditions(romanian: str) -> str:
+    """
+    Translate Romanian weather conditions to English.
+    
+    Memoized: a forecast document repeats a small set of phrases across
+    thousands of <prognoza> entries.
+    """
+    if not romanian:
+        return "Unknown"
+    
+    # Check for compound conditions
+    found = set()
+    for match in _COND_RE.finditer(romanian.upper()):
+        found.update(_COND_PREFIXES[match.group(1)])
+    result_parts = [en for ro, en in _TRANSLATIONS.items() if ro in found]
+    
+    if result_parts:
+        return ", ".join(result_parts)
+    
+    # Return original if no translation found
+    return romanian.title()
+
+
 class ANMFetcher:
     """
     Fetcher for ANM (Romanian National Meteorology Administration) data.
@@ -135,6 +336,13 @@ class ANMFetcher:
         self._session = self._create_session()
         self._last_fetch_metadata: Dict[str, FetchMetadata] = {}
         self._cached_cities: List[str] = []
+        # Conditional GET state per URL: (Last-Modified, ETag) of the last
+        # committed payload, and the (entries, metadata) it produced (also
+        # re-served when a full response repeats the same body). A parsed
+        # payload waits in _pending_payload until commit_payload().
+        self._validators: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._last_payload: Dict[str, Tuple[Any, FetchMetadata]] = {}
+        self._pending_payload: Dict[str, Tuple[Tuple[Optional[str], Optional[str]], Any, FetchMetadata]] = {}
     
     def _create_session(self) -> requests.Session:
         """Create HTTP session with retry strategy for availability."""
@@ -147,27 +355,58 @@ class ANMFetcher:
             allowed_methods=["GET", "HEAD"]
         )
         
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        adapter = HTTPAdapter(
+            max_retries=retry_strategy,
+            pool_connections=HTTP_POOL_SIZE,
+            pool_maxsize=HTTP_POOL_SIZE
+        )
         session.mount("http://", adapter)
         session.mount("https://", adapter)
         
         session.headers.update({
             "User-Agent": USER_AGENT,
-            "Accept": "application/xml, text/xml, application/rss+xml, */*"
+            "Accept": "application/xml, text/xml, application/rss+xml, */*",
+            # The XML/RSS payloads are text-heavy and compress well
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive"
         })
         
         return session
     
-    def _fetch_raw(self, url: str) -> Tuple[bytes, int]:
-        """Fetch raw content with timing."""
-        start_time = datetime.utcnow()
+    def _fetch_raw(self, url: str) -> Tuple[bytes, int, Tuple[Optional[str], Optional[str]]]:
+        """
+        Fetch raw content with timing.
+        
+        Sends If-Modified-Since / If-None-Match from the last successful
+        fetch of this URL and raises NotModified on a 304.
+        
+        Returns:
+            (content, response_time_ms, (Last-Modified, ETag) of the response)
+        """
+        start_ns = time.perf_counter_ns()
+        
+        headers = {}
+        last_modified, etag = self._validators.get(url, (None, None))
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        if etag:
+            headers["If-None-Match"] = etag
         
         try:
-            response = self._session.get(url, timeout=self.timeout, allow_redirects=True)
+            response = self._session.get(
+                url,
+                headers=headers,
+                timeout=(min(CONNECT_TIMEOUT, self.timeout), self.timeout),
+                allow_redirects=True
+            )
             response.raise_for_status()
             
-            response_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
-            return response.content, response_time
+            response_time = (time.perf_counter_ns() - start_ns) // 1_000_000
+            if response.status_code == 304:
+                raise NotModified(response_time)
+            
+            validators = (response.headers.get("Last-Modified"), response.headers.get("ETag"))
+            return response.content, response_time, validators
             
         except requests.Timeout:
             raise FetchError(f"Request timed out after {self.timeout}s")
@@ -178,10 +417,82 @@ class ANMFetcher:
         except requests.RequestException as e:
             raise FetchError(f"Request failed: {e}")
     
-    def _compute_hash(self, *args) -> str:
-        """Compute SHA-256 hash for integrity verification."""
-        content = "|".join(str(a) for a in args)
-        return hashlib.sha256(content.encode("utf-8", errors="ignore")).hexdigest()
+    def _remember_payload(
+        self,
+        url: str,
+        validators: Tuple[Optional[str], Optional[str]],
+        entries: Any,
+        metadata: FetchMetadata
+    ) -> None:
+        """Stage validators and parsed result for conditional GETs of url."""
+        self._pending_payload[url] = (validators, entries, metadata)
+    
+    def commit_payload(self, url: str) -> None:
+        """
+        Adopt the last parsed payload of url as its conditional GET baseline.
+        
+        Call once the payload's entries are stored. Until then a 304 or a
+        repeated body is not reported as not_modified, so entries whose
+        write failed are fetched and parsed again.
+        """
+        pending = self._pending_payload.pop(url, None)
+        if pending is None:
+            return
+        validators, entries, metadata = pending
+        self._last_payload[url] = (entries, metadata)
+        if any(validators):
+            self._validators[url] = validators
+        else:
+            self._validators.pop(url, None)
+    
+    def _is_unchanged_payload(
+        self,
+        url: str,
+        payload_hash: bytes,
+        validators: Tuple[Optional[str], Optional[str]]
+    ) -> bool:
+        """
+        Whether a full response repeats the last parsed body of url.
+        
+        Catches unchanged feeds served without ETag/Last-Modified support,
+        so they skip parsing like a 304 does.
+        """
+        last = self._last_payload.get(url)
+        if last is None or last[1].payload_hash != payload_hash:
+            return False
+        if any(validators):
+            self._validators[url] = validators
+        return True
+    
+    def _not_modified_result(
+        self,
+        url: str,
+        fetch_time: str,
+        response_time_ms: int
+    ) -> Tuple[Any, FetchMetadata]:
+        """Re-serve the entries parsed from the unchanged payload at url."""
+        entries, last_metadata = self._last_payload[url]
+        metadata = replace(
+            last_metadata,
+            fetch_time=fetch_time,
+            response_time_ms=response_time_ms,
+            is_fresh=True,
+            not_modified=True
+        )
+        self._last_fetch_metadata[url] = metadata
+        return entries, metadata
+    
+    def _compute_hash(self, *args) -> bytes:
+        """
+        Compute a 128-bit BLAKE2b hash for integrity verification.
+        
+        Only used as a dedup key, so the raw 16-byte digest is kept: no hex
+        encoding, and keys compare and index at a quarter of the size of a
+        SHA-256 hexdigest.
+        """
+        digest = _HASH_PROTO.copy()
+        digest.update("|".join(map(str, args)).encode("utf-8", errors="ignore"))
+        return digest.digest()
     
     # =========================================================================
     # XML Forecast Parsing (State-Based Data)
@@ -194,21 +505,41 @@ class ANMFetcher:
         Returns:
             Tuple of (list of CityForecast objects, FetchMetadata)
         """
-        fetch_start = datetime.utcnow()
+        batch, metadata = self.fetch_forecasts_batch()
+        return batch.to_forecasts(), metadata
+    
+    def fetch_forecasts_batch(self) -> Tuple[ForecastBatch, FetchMetadata]:
+        """
+        Fetch and parse ANM XML forecasts into column-oriented form.
+        
+        Same fetch as fetch_forecasts(), without building one CityForecast
+        per entry.
+        
+        Returns:
+            Tuple of (ForecastBatch, FetchMetadata)
+        """
+        # Wall clock for the reported timestamp, monotonic clock for durations
+        fetch_time = datetime.utcnow().isoformat()
+        start_ns = time.perf_counter_ns()
         url = ANM_FORECAST_XML_URL
         
         try:
-            raw_content, response_time = self._fetch_raw(url)
+            raw_content, response_time, validators = self._fetch_raw(url)
             
-            # Validate XML structure
-            if not self._validate_xml_structure(raw_content):
-                raise ValidationError("Invalid XML structure")
+            payload_hash = hashlib.sha256(raw_content).digest()
+            if self._is_unchanged_payload(url, payload_hash, validators):
+                logger.info("Forecast payload unchanged since last fetch")
+                return self._not_modified_result(url, fetch_time, response_time)
             
-            # Parse forecasts
-            forecasts, valid_count, total_count = self._parse_forecast_xml(raw_content)
+            # Stream-parse forecasts; a document that does not parse fails validation
+            try:
+                batch, cities, valid_count, total_count = self._parse_forecast_xml(raw_content)
+            except ET.ParseError as e:
+                logger.error(f"XML parsing error: {e}")
+                raise ValidationError(f"Invalid XML structure: {e}")
             
-            # Update cached cities list
-            self._cached_cities = list(set(f.city for f in forecasts))
+            # Update cached cities list (kept sorted)
+            self._cached_cities = sorted(cities)
             
             # Assess quality
             data_quality = self._assess_quality(valid_count, total_count)
@@ -216,7 +547,7 @@ class ANMFetcher:
             metadata = FetchMetadata(
                 source_url=url,
                 source_type=SourceType.FORECAST,
-                fetch_time=fetch_start.isoformat(),
+                fetch_time=fetch_time,
                 success=True,
                 entries_count=total_count,
                 valid_entries=valid_count,
@@ -224,180 +555,234 @@ class ANMFetcher:
                 response_time_ms=response_time,
                 data_quality=data_quality,
                 is_fresh=True,
-                last_modified=None
+                last_modified=validators[0],
+                payload_hash=payload_hash
             )
             
             self._last_fetch_metadata[url] = metadata
+            self._remember_payload(url, validators, batch, metadata)
             logger.info(f"Fetched forecasts: {valid_count}/{total_count} valid, {len(self._cached_cities)} cities")
             
-            return forecasts, metadata
+            return batch, metadata
+            
+        except NotModified as e:
+            logger.info("Forecasts not modified since last fetch")
+            return self._not_modified_result(url, fetch_time, e.response_time_ms)
             
         except (FetchError, ValidationError) as e:
             metadata = FetchMetadata(
                 source_url=url,
                 source_type=SourceType.FORECAST,
-                fetch_time=fetch_start.isoformat(),
+                fetch_time=fetch_time,
                 success=False,
                 entries_count=0,
                 valid_entries=0,
                 error_message=str(e),
-                response_time_ms=int((datetime.utcnow() - fetch_start).total_seconds() * 1000),
+                response_time_ms=(time.perf_counter_ns() - start_ns) // 1_000_000,
                 data_quality=DataQuality.UNAVAILABLE,
                 is_fresh=False,
                 last_modified=None
             )
             self._last_fetch_metadata[url] = metadata
             logger.error(f"Forecast fetch failed: {e}")
-            return [], metadata
+            return ForecastBatch(), metadata
     
-    def _validate_xml_structure(self, content: bytes) -> bool:
-        """Validate XML structure for integrity."""
-        try:
-            content_str = content.decode("utf-8", errors="ignore")
-            
-            if not content_str.strip():
-                return False
+    def _parse_forecast_xml(
+        self,
+        content: bytes
+    ) -> Tuple[ForecastBatch, List[str], int, int]:
+        """
+        Parse ANM XML forecast format into a ForecastBatch.
+        
+        Streams the document with iterparse and handles each <localitate>
+        as soon as it closes, then frees it, so only one city block is
+        held in memory at a time. Raises ET.ParseError on malformed XML.
+        
+        Temperatures are collected as text and converted in one pass once
+        the document has been read.
+        
+        Returns:
+            (batch, distinct cities with valid forecasts, valid count, total count)
+        """
+        # Cheap byte-level sniff so empty or non-XML payloads (e.g. a
+        # plain-text error page) never reach the parser
+        if not self._payload_head(content).startswith(b"<"):
+            raise ValidationError("Invalid XML structure: payload is not XML")
+        
+        cities: List[str] = []
+        forecast_dates: List[str] = []
+        data_dates: List[str] = []
+        temp_min_texts: List[str] = []
+        temp_max_texts: List[str] = []
+        conditions: List[str] = []
+        conditions_codes: List[str] = []
+        cities_seen: Dict[str, None] = {}
+        total_count = 0
+        
+        if _HAS_LXML:
+            # Filtered in C: only <localitate> end events reach Python
+            events = ET.iterparse(io.BytesIO(content), events=("end",), tag="localitate")
+        else:
+            events = ET.iterparse(io.BytesIO(content), events=("end",))
+        
+        for _, localitate in events:
+            if localitate.tag != "localitate":
+                continue
             
-            if "<?xml" not in content_str and not content_str.strip().startswith("<"):
-                return False
+            city_name = localitate.get("nume", "").strip()
             
-            # Try to parse
-            ET.fromstring(content)
-            return True
+            if not city_name:
+                self._release_element(localitate)
+                continue
             
-        except ET.ParseError:
-            return False
-        except Exception:
-            return False
-    
-    def _parse_forecast_xml(self, content: bytes) -> Tuple[List[CityForecast], int, int]:
-        """Parse ANM XML forecast format."""
-        forecasts = []
-        valid_count = 0
-        total_count = 0
-        
-        try:
-            root = ET.fromstring(content)
+            # Get the data generation date
+            data_prognozei = localitate.findtext("DataPrognozei", "")
             
-            # Find all city elements
-            for localitate in root.findall(".//localitate"):
-                city_name = localitate.get("nume", "").strip()
+            # Stage each forecast day
+            for prognoza in localitate.findall("prognoza"):
+                total_count += 1
                 
-                if not city_name:
-                    continue
+                forecast_date = prognoza.get("data", "")
+                temp_min_text = prognoza.findtext("temp_min", "")
+                temp_max_text = prognoza.findtext("temp_max", "")
                 
-                # Get the data generation date
-                data_prognozei = localitate.findtext("DataPrognozei", "")
+                # Validate required fields
+                if not all([forecast_date, temp_min_text, temp_max_text]):
+                    continue
                 
-                # Parse each forecast day
-                for prognoza in localitate.findall("prognoza"):
-                    total_count += 1
-                    
-                    try:
-                        forecast_date = prognoza.get("data", "")
-                        temp_min_text = prognoza.findtext("temp_min", "")
-                        temp_max_text = prognoza.findtext("temp_max", "")
-                        conditions = prognoza.findtext("fenomen_descriere", "")
-                        conditions_code = prognoza.findtext("fenomen_simbol", "")
-                        
-                        # Validate required fields
-                        if not all([forecast_date, temp_min_text, temp_max_text]):
-                            continue
-                        
-                        temp_min = int(temp_min_text)
-                        temp_max = int(temp_max_text)
-                        
-                        # Translate conditions to English
-                        conditions_en = self._translate_conditions(conditions)
-                        
-                        content_hash = self._compute_hash(
-                            city_name, forecast_date, temp_min, temp_max, conditions
-                        )
-                        
-                        forecast = CityForecast(
-                            city=city_name,
-                            forecast_date=forecast_date,
-                            data_date=data_prognozei,
-                            temp_min=temp_min,
-                            temp_max=temp_max,
-                            conditions=conditions_en,
-                            conditions_code=conditions_code,
-                            source_url=ANM_FORECAST_XML_URL,
-                            content_hash=content_hash
-                        )
-                        
-                        forecasts.append(forecast)
-                        valid_count += 1
-                        
-                    except (ValueError, TypeError) as e:
-                        logger.warning(f"Failed to parse forecast for {city_name}: {e}")
-                        continue
+                cities.append(city_name)
+                forecast_dates.append(forecast_date)
+                data_dates.append(data_prognozei)
+                temp_min_texts.append(temp_min_text)
+                temp_max_texts.append(temp_max_text)
+                conditions.append(prognoza.findtext("fenomen_descriere", ""))
+                conditions_codes.append(prognoza.findtext("fenomen_simbol", ""))
             
-        except ET.ParseError as e:
-            logger.error(f"XML parsing error: {e}")
-            raise ValidationError(f"XML parsing failed: {e}")
-        
-        return forecasts, valid_count, total_count
-    
-    def _translate_conditions(self, romanian: str) -> str:
-        """Translate Romanian weather conditions to English."""
-        if not romanian:
-            return "Unknown"
-        
-        translations = {
-            "CER SENIN": "Clear Sky",
-            "CER VARIABIL": "Partly Cloudy",
-            "CER PARTIAL NOROS": "Partly Cloudy",
-            "CER MAI MULT NOROS": "Mostly Cloudy",
-            "CER NOROS": "Cloudy",
-            "INNNORAT": "Overcast",
-            "PLOAIE SLABA": "Light Rain",
-            "PLOAIE": "Rain",
-            "PLOAIE MODERATA": "Moderate Rain",
-            "PLOI": "Rainy",
-            "AVERSE": "Showers",
-            "FURTUNA": "Thunderstorm",
-            "NINSOARE SLABA": "Light Snow",
-            "NINSOARE": "Snow",
-            "NINSOARE MODERATA": "Moderate Snow",
-            "LAPOVITA": "Sleet",
-            "CEATA": "Fog",
-            "BURNITA": "Drizzle",
-        }
-        
-        # Check for compound conditions
-        result_parts = []
-        romanian_upper = romanian.upper()
-        
-        for ro, en in translations.items():
-            if ro in romanian_upper:
-                result_parts.append(en)
-        
-        if result_parts:
-            return ", ".join(result_parts)
-        
-        # Return original if no translation found
-        return romanian.title()
+            if cities and cities[-1] == city_name:
+                cities_seen[city_name] = None
+            self._release_element(localitate)
+        
+        # Batched temperature conversion; on any bad value fall back to a
+        # per-entry pass that drops (and logs) only the offending entries
+        try:
+            temp_min = array(TEMP_ARRAY_TYPE, map(int, temp_min_texts))
+            temp_max = array(TEMP_ARRAY_TYPE, map(int, temp_max_texts))
+        except (ValueError, OverflowError):
+            temp_min, temp_max, keep = self._convert_temperatures(
+                cities, temp_min_texts, temp_max_texts
+            )
+            cities = [cities[i] for i in keep]
+            forecast_dates = [forecast_dates[i] for i in keep]
+            data_dates = [data_dates[i] for i in keep]
+            conditions = [conditions[i] for i in keep]
+            conditions_codes = [conditions_codes[i] for i in keep]
+            cities_seen = dict.fromkeys(cities)
+        
+        batch = ForecastBatch(
+            cities=cities,
+            forecast_dates=forecast_dates,
+            data_dates=data_dates,
+            temp_min=temp_min,
+            temp_max=temp_max,
+            conditions=[_translate_conditions(c) for c in conditions],
+            conditions_code=conditions_codes,
+            # Covers every stored column: the bulk insert skips rows whose
+            # hash matches, so a new run (data_date) must change it
+            content_hashes=[
+                self._compute_hash(*entry)
+                for entry in zip(
+                    cities, forecast_dates, temp_min, temp_max, conditions,
+                    data_dates, conditions_codes
+                )
+            ]
+        )
+        return batch, list(cities_seen), len(batch), total_count
+    
+    @staticmethod
+    def _convert_temperatures(
+        cities: List[str],
+        temp_min_texts: List[str],
+        temp_max_texts: List[str]
+    ) -> Tuple[array, array, List[int]]:
+        """Convert temperatures entry by entry, returning the indices kept."""
+        temp_min = array(TEMP_ARRAY_TYPE)
+        temp_max = array(TEMP_ARRAY_TYPE)
+        keep = []
+        
+        for i, (min_text, max_text) in enumerate(zip(temp_min_texts, temp_max_texts)):
+            try:
+                low = int(min_text)
+                high = int(max_text)
+                temp_min.append(low)
+                try:
+                    temp_max.append(high)
+                except OverflowError:
+                    temp_min.pop()
+                    raise
+            except (ValueError, OverflowError) as e:
+                logger.warning(f"Failed to parse forecast for {cities[i]}: {e}")
+                continue
+            keep.append(i)
+        
+        return temp_min, temp_max, keep
+    
+    @staticmethod
+    def _payload_head(content: bytes, size: int = 256) -> bytes:
+        """
+        First bytes of a payload past leading whitespace and a UTF-8 BOM.
+        
+        Lets the parsers reject empty or non-XML bodies from a short byte
+        slice instead of decoding or stripping the whole buffer.
+        """
+        head = content[:size].lstrip()
+        if head.startswith(codecs.BOM_UTF8):
+            head = head[len(codecs.BOM_UTF8):].lstrip()
+        return head
+    
+    @staticmethod
+    def _release_element(elem: Any) -> None:
+        """Free a fully processed iterparse element and its finished siblings."""
+        elem.clear()
+        if _HAS_LXML:
+            # lxml keeps cleared elements attached to the root; drop them
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
     
     # =========================================================================
     # RSS Alert Parsing (Event-Based Data)
     # =========================================================================
     
-    def fetch_alerts(self) -> Tuple[List[WeatherAlert], FetchMetadata]:
+    def fetch_alerts(
+        self,
+        is_known: Optional[Callable[[bytes], bool]] = None
+    ) -> Tuple[List[WeatherAlert], FetchMetadata]:
         """
         Fetch and parse ANM RSS weather alerts.
         
+        Args:
+            is_known: Optional content-hash predicate for alerts that are
+                already stored; those are left out of the result and parsing
+                stops after KNOWN_ALERT_STREAK of them in a row
+        
         Returns:
             Tuple of (list of WeatherAlert objects, FetchMetadata)
         """
-        fetch_start = datetime.utcnow()
+        # Wall clock for the reported timestamp, monotonic clock for durations
+        fetch_time = datetime.utcnow().isoformat()
+        start_ns = time.perf_counter_ns()
         url = ANM_ALERTS_RSS_URL
         
         try:
-            raw_content, response_time = self._fetch_raw(url)
+            raw_content, response_time, validators = self._fetch_raw(url)
+            
+            payload_hash = hashlib.sha256(raw_content).digest()
+            if self._is_unchanged_payload(url, payload_hash, validators):
+                logger.info("Alert payload unchanged since last fetch")
+                alerts, metadata = self._not_modified_result(url, fetch_time, response_time)
+                return list(alerts), metadata
             
             # Parse RSS feed
-            alerts, valid_count, total_count = self._parse_alert_rss(raw_content)
+            alerts, valid_count, total_count = self._parse_alert_rss(raw_content, is_known)
             
             # Assess quality
             data_quality = self._assess_quality(valid_count, total_count)
@@ -405,7 +790,7 @@ class ANMFetcher:
             metadata = FetchMetadata(
                 source_url=url,
                 source_type=SourceType.ALERT,
-                fetch_time=fetch_start.isoformat(),
+                fetch_time=fetch_time,
                 success=True,
                 entries_count=total_count,
                 valid_entries=valid_count,
@@ -413,24 +798,31 @@ class ANMFetcher:
                 response_time_ms=response_time,
                 data_quality=data_quality,
                 is_fresh=True,
-                last_modified=None
+                last_modified=validators[0],
+                payload_hash=payload_hash
             )
             
             self._last_fetch_metadata[url] = metadata
+            self._remember_payload(url, validators, alerts, metadata)
             logger.info(f"Fetched alerts: {valid_count}/{total_count} valid")
             
             return alerts, metadata
             
+        except NotModified as e:
+            logger.info("Alerts not modified since last fetch")
+            alerts, metadata = self._not_modified_result(url, fetch_time, e.response_time_ms)
+            return list(alerts), metadata
+            
         except (FetchError, ValidationError) as e:
             metadata = FetchMetadata(
                 source_url=url,
                 source_type=SourceType.ALERT,
-                fetch_time=fetch_start.isoformat(),
+                fetch_time=fetch_time,
                 success=False,
                 entries_count=0,
                 valid_entries=0,
                 error_message=str(e),
-                response_time_ms=int((datetime.utcnow() - fetch_start).total_seconds() * 1000),
+                response_time_ms=(time.perf_counter_ns() - start_ns) // 1_000_000,
                 data_quality=DataQuality.UNAVAILABLE,
                 is_fresh=False,
                 last_modified=None
@@ -439,42 +831,70 @@ class ANMFetcher:
             logger.error(f"Alert fetch failed: {e}")
             return [], metadata
     
-    def _parse_alert_rss(self, content: bytes) -> Tuple[List[WeatherAlert], int, int]:
-        """Parse ANM RSS alert format."""
+    def _parse_alert_rss(
+        self,
+        content: bytes,
+        is_known: Optional[Callable[[bytes], bool]] = None
+    ) -> Tuple[List[WeatherAlert], int, int]:
+        """
+        Parse ANM RSS alert format.
+        
+        Items whose hash satisfies is_known are counted as valid but not
+        rebuilt; once KNOWN_ALERT_STREAK of them follow each other, the
+        remaining (older) items are only counted.
+        """
         alerts = []
         valid_count = 0
         total_count = 0
+        known_streak = 0
         
-        parsed = feedparser.parse(content)
+        head = self._payload_head(content)
+        if not head:
+            return alerts, valid_count, total_count
+        if not head.startswith(b"<"):
+            raise ValidationError("RSS parsing failed: payload is not XML")
         
-        if parsed.bozo and not parsed.entries:
-            raise ValidationError(f"RSS parsing failed: {parsed.bozo_exception}")
+        try:
+            root = self._parse_rss_root(content)
+        except ET.ParseError as e:
+            raise ValidationError(f"RSS parsing failed: {e}")
+        if root is None:
+            raise ValidationError("RSS parsing failed: no XML content")
         
-        for item in parsed.entries:
+        items = root.iter("item")
+        for item in items:
             total_count += 1
             
             try:
-                title = self._clean_html(getattr(item, "title", "") or "")
-                description_raw = getattr(item, "summary", "") or getattr(item, "description", "") or ""
-                
-                # Parse alert details
-                alert_level = self._extract_alert_level(description_raw)
-                affected_zones = self._extract_zones(description_raw)
-                time_range = self._extract_time_range(description_raw)
-                description = self._format_alert_description(description_raw)
+                title = self._clean_html(item.findtext("title") or "")
+                description_raw = item.findtext("description") or ""
                 
                 # Get publication date
-                published_at = None
-                if hasattr(item, "published_parsed") and item.published_parsed:
-                    try:
-                        published_at = datetime(*item.published_parsed[:6]).isoformat()
-                    except Exception:
-                        published_at = getattr(item, "published", None)
-                
-                link = getattr(item, "link", None)
+                published_at = self._parse_pub_date(item.findtext("pubDate"))
                 
                 content_hash = self._compute_hash(title, description_raw, published_at)
                 
+                # Already stored: skip the text extraction
+                if is_known is not None and is_known(content_hash):
+                    valid_count += 1
+                    known_streak += 1
+                    if known_streak >= KNOWN_ALERT_STREAK:
+                        remaining = sum(1 for _ in items)
+                        total_count += remaining
+                        valid_count += remaining
+                        break
+                    continue
+                known_streak = 0
+                
+                # Parse alert details (strip the HTML once, share the result)
+                description_clean = self._clean_html(description_raw)
+                alert_level = self._extract_alert_level(description_raw)
+                affected_zones = self._extract_zones(description_clean)
+                time_range = self._extract_time_range(description_raw)
+                description = self._format_alert_description(description_clean)
+                
+                link = (item.findtext("link") or "").strip() or None
+                
                 alert = WeatherAlert(
                     title=title if title else "Weather Alert",
                     description=description,
@@ -496,74 +916,148 @@ class ANMFetcher:
         
         return alerts, valid_count, total_count
     
+    @staticmethod
+    def _parse_rss_root(content: bytes) -> Any:
+        """
+        Parse an RSS document into its root element.
+        
+        lxml recovers from the small well-formedness slips feeds tend to
+        have (and returns None for non-XML input); entity expansion is off.
+        Named HTML entities are made numeric first, as XML lacks them.
+        """
+        if b'&' in content:
+            content = _HTML_ENTITY_RE.sub(ANMFetcher._numeric_entity, content)
+        if _HAS_LXML:
+            parser = ET.XMLParser(recover=True, resolve_entities=False)
+            return ET.fromstring(content, parser)
+        return ET.fromstring(content)
+    
+    @staticmethod
+    def _numeric_entity(match: "re.Match[bytes]") -> bytes:
+        """Replace a named HTML entity with its numeric character reference."""
+        if match.group(1) is None:
+            return match.group(0)
+        name = match.group(1).decode("ascii")
+        if name in _XML_ENTITIES:
+            return match.group(0)
+        codepoint = name2codepoint.get(name)
+        if codepoint is None:
+            return b"&amp;" + match.group(0)[1:]
+        return b"&#%d;" % codepoint
+    
+    @staticmethod
+    def _parse_pub_date(value: Optional[str]) -> Optional[str]:
+        """Convert an RFC 822 pubDate to a naive UTC ISO timestamp."""
+        if not value:
+            return None
+        try:
+            published = parsedate_to_datetime(value.strip())
+        except (TypeError, ValueError):
+            return None
+        if published.tzinfo is not None:
+            published = published.astimezone(timezone.utc).replace(tzinfo=None)
+        return published.isoformat()
+    
     def _clean_html(self, text: str) -> str:
         """Remove HTML tags and decode HTML entities from text."""
         if not text:
             return ""
-        # Remove HTML tags
-        text = re.sub(r'<[^>]+>', ' ', text)
+        # Remove HTML tags (plain titles usually have none)
+        if '<' in text:
+            text = _TAG_RE.sub(' ', text)
         # Decode all HTML entities (e.g., &icirc; -> î, &ndash; -> –)
-        text = html.unescape(text)
+        if '&' in text:
+            text = html.unescape(text)
         # Normalize whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _WS_RE.sub(' ', text).strip()
         return text
     
     def _extract_alert_level(self, text: str) -> Optional[str]:
         """Extract alert level (COD) from Romanian alert."""
-        match = re.search(r'COD\s*:\s*(\w+)', text, re.IGNORECASE)
+        match = _COD_RE.search(text)
         if match:
             level = match.group(1).upper()
-            levels = {"GALBEN": "YELLOW", "PORTOCALIU": "ORANGE", "ROSU": "RED"}
-            return levels.get(level, level)
+            return _ALERT_LEVELS.get(level, level)
         return None
     
-    def _extract_zones(self, text: str) -> Optional[str]:
-        """Extract affected zones from alert."""
-        match = re.search(r'In zona\s*:\s*(.+?)(?:Se vor|$)', self._clean_html(text))
+    def _extract_zones(self, clean: str) -> Optional[str]:
+        """Extract affected zones from cleaned (HTML-stripped) alert text."""
+        match = _ZONE_RE.search(clean)
         if match:
-            zones = match.group(1).strip()
+            zones = match.group(1)
+            end = zones.find("Se vor", 1)
+            if end != -1:
+                zones = zones[:end]
+            zones = zones.strip()
             return zones[:200] if len(zones) > 200 else zones
         return None
     
     def _extract_time_range(self, text: str) -> Optional[str]:
         """Extract time range from alert."""
-        match = re.search(r'Intre orele\s*:\s*([\d:]+)\s*si\s*([\d:]+)', text)
+        match = _TIME_RE.search(text)
         if match:
             return f"{match.group(1)} - {match.group(2)}"
         return None
     
-    def _format_alert_description(self, text: str) -> str:
-        """Format alert description for display."""
-        clean = self._clean_html(text)
-        
-        # Try different patterns for extracting the main phenomena description
-        patterns = [
-            # Pattern for "Se vor semnala: ..." (nowcast alerts)
-            r'Se vor semnala\s*:\s*(.+?)(?:$)',
-            # Pattern for "Fenomene vizate: ..." (meteorological bulletins)
-            r'Fenomene vizate\s*:\s*(.+?)(?:$)',
-            # Pattern for just the phenomena after all the metadata
-            r'Fenomene\s*:\s*conform textelor\s+Mesaj\s*:\s*(.+?)(?:Interval de valabilitate|$)',
-        ]
+    def _format_alert_description(self, clean: str) -> str:
+        """Format cleaned (HTML-stripped) alert description for display."""
+        # Single pass over the text for the first occurrence of every marker
+        marker_pos: Dict[int, int] = {}
+        for marker in _DESC_MARKER_RE.finditer(clean):
+            marker_pos.setdefault(marker.lastindex, marker.start())
+            if len(marker_pos) == _DESC_FALLBACK_GROUP:
+                break
         
-        for pattern in patterns:
-            match = re.search(pattern, clean, re.IGNORECASE)
+        # Try the patterns in priority order, anchored at their marker
+        for group, pattern in enumerate(_FORMAT_PATTERNS, start=1):
+            if group not in marker_pos:
+                continue
+            match = pattern.match(clean, marker_pos[group])
             if match:
                 result = match.group(1).strip()
                 # Clean up any trailing metadata
-                result = re.sub(r'\s*Interval de valabilitate.*$', '', result, flags=re.IGNORECASE)
+                result = _TRAILING_META_RE.sub('', result)
                 if len(result) > 20:  # Only use if we got something meaningful
                     return result[:500] if len(result) > 500 else result
         
         # Fallback: try to extract just after "Mesaj :" for bulletins
-        match = re.search(r'Mesaj\s*:\s*(?:MESAJ\s*\d+/\d+\s*)?(.+?)(?:Interval de valabilitate|$)', clean, re.IGNORECASE)
+        match = None
+        if _DESC_FALLBACK_GROUP in marker_pos:
+            match = _MESAJ_RE.match(clean, marker_pos[_DESC_FALLBACK_GROUP])
         if match:
-            result = match.group(1).strip()
+            result = match.group(1)
+            validity = _VALIDITY_RE.search(result, 1)
+            if validity:
+                result = result[:validity.start()]
+            result = result.strip()
             if len(result) > 20:
                 return result[:500] if len(result) > 500 else result
         
         return clean[:500] if len(clean) > 500 else clean
     
+    # =========================================================================
+    # Combined Fetch
+    # =========================================================================
+    
+    def fetch_all(self) -> Tuple[
+        Tuple[List[CityForecast], FetchMetadata],
+        Tuple[List[WeatherAlert], FetchMetadata]
+    ]:
+        """
+        Fetch forecasts and alerts concurrently.
+        
+        Both sources live on the same host, so the two requests overlap on
+        pooled keep-alive connections and the wall time is roughly that of
+        the slower one instead of the sum.
+        
+        Returns:
+            ((forecasts, metadata), (alerts, metadata))
+        """
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="anm-fetch") as executor:
+            forecasts = executor.submit(self.fetch_forecasts)
+            alerts = executor.submit(self.fetch_alerts)
+            return forecasts.result(), alerts.result()
+    
     # =========================================================================
     # Quality Assessment
     # =========================================================================
@@ -582,14 +1076,14 @@ class ANMFetcher:
     
     def get_available_cities(self) -> List[str]:
         """Get list of available cities from last forecast fetch."""
-        return sorted(self._cached_cities)
+        return list(self._cached_cities)
     
     def get_source_health(self) -> Dict[str, FetchMetadata]:
         """Get health status of all sources."""
         return self._last_fetch_metadata.copy()
     
     def close(self) -> None:
-        """Close HTTP session."""
+        """Close HTTP session (pooled connections are reopened on next use)."""
         self._session.close()
 
 
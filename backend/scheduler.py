@@ -7,10 +7,17 @@ Handles periodic data fetching from heterogeneous ANM sources:
 """
 
 import logging
-from typing import List, Optional, Dict
-from datetime import datetime
-from dataclasses import dataclass, asdict
+import math
+import random
+import statistics
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, List, Optional, Dict, Tuple
+from datetime import datetime, timedelta
+from dataclasses import dataclass, field, fields
 
+from apscheduler.executors.pool import ThreadPoolExecutor as JobThreadPool
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
@@ -32,8 +39,46 @@ logger = logging.getLogger(__name__)
 FORECAST_POLL_INTERVAL_MINUTES = 60  # XML forecasts update less frequently
 ALERT_POLL_INTERVAL_MINUTES = 10     # Alerts need frequent checking
 
+# One worker per job: each job runs at most one instance at a time, so
+# APScheduler's default 10-thread pool only adds idle threads
+SCHEDULER_WORKERS = 2
 
-@dataclass
+# Alerts are marked inactive on ingest once this long has passed since
+# they were first stored (fetched_at_epoch is set on insert only, so an
+# alert still listed in the feed expires all the same)
+ALERT_RETENTION_HOURS = 48
+
+# Adaptive alert polling: poll at a fraction of the median gap between
+# fetches that brought new alerts, within these bounds. A gap no longer
+# than ALERT_GAP_CENSOR_RATIO poll intervals is bounded by polling itself
+# and is taken as is; every poll that finds nothing stretches a shortened
+# interval by ALERT_RECOVERY_FACTOR, back up to the configured one.
+ALERT_MIN_INTERVAL_MINUTES = 2
+ALERT_MAX_INTERVAL_MINUTES = 30
+ALERT_GAP_FACTOR = 0.5
+ALERT_GAP_CENSOR_RATIO = 1.5
+ALERT_RECOVERY_FACTOR = 1.25
+ALERT_GAP_HISTORY = 200
+
+# Failing sources are polled at a truncated exponential backoff with jitter
+FAILURE_BACKOFF_BASE = 1.3
+FAILURE_BACKOFF_JITTER = 0.2
+FORECAST_MAX_BACKOFF_MINUTES = 240
+ALERT_MAX_BACKOFF_MINUTES = 60
+
+# Identical successful polls are counted in memory and written to
+# source_status at most every this many polls
+STATUS_MAX_SKIPPED_WRITES = 5
+
+
+def _build_dict(instance: Any) -> None:
+    """Precompute the field dict of a frozen dataclass instance."""
+    object.__setattr__(instance, "_dict", {
+        f.name: getattr(instance, f.name) for f in fields(instance) if f.init
+    })
+
+
+@dataclass(slots=True, frozen=True)
 class FetchResult:
     """Result of a fetch operation."""
     source_url: str
@@ -46,9 +91,17 @@ class FetchResult:
     fetch_time: str
     data_quality: str
     response_time_ms: int
+    _dict: Dict[str, Any] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self) -> None:
+        _build_dict(self)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Field values as a dict (shared; do not mutate)."""
+        return self._dict
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SyncStatus:
     """Synchronization status across all sources."""
     last_sync_time: str
@@ -57,6 +110,14 @@ class SyncStatus:
     overall_quality: str
     cities_available: int
     active_alerts: int
+    _dict: Dict[str, Any] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self) -> None:
+        _build_dict(self)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Field values as a dict (shared; do not mutate)."""
+        return self._dict
 
 
 class WeatherScheduler:
@@ -78,12 +139,40 @@ class WeatherScheduler:
         self.forecast_interval = forecast_interval
         self.alert_interval = alert_interval
         self.fetcher = ANMFetcher()
-        self.scheduler = BackgroundScheduler()
+        self.scheduler = BackgroundScheduler(
+            executors={'default': JobThreadPool(max_workers=SCHEDULER_WORKERS)}
+        )
         self._is_running = False
         
         self._last_forecast_result: Optional[FetchResult] = None
         self._last_alert_result: Optional[FetchResult] = None
         self._last_sync_status: Optional[SyncStatus] = None
+        
+        # (monotonic time, poll interval in minutes) of alert fetches that
+        # added entries, and the interval each job currently runs at
+        self._alert_arrivals: Deque[Tuple[int, float]] = deque(maxlen=ALERT_GAP_HISTORY + 1)
+        self._job_intervals: Dict[str, float] = {}
+        # Healthy-source interval per job and consecutive failures per job
+        self._base_intervals: Dict[str, float] = {
+            'forecast_job': forecast_interval,
+            'alert_job': alert_interval,
+        }
+        self._failures: Dict[str, int] = {}
+        
+        # City list copied from the fetcher only after it parses a new feed
+        self._cached_cities: List[str] = []
+        self._cities_dirty = True
+        
+        # Set by start() when forecasts ride on the alert job's ticks
+        self._coalesced = False
+        self._next_forecast_ns = 0
+        
+        # Fingerprint of the status last written per source URL, the polls
+        # not yet written (latest metadata, type, name, count, summed
+        # response time) and the latest fetch time per source type
+        self._last_status_fingerprint: Dict[str, tuple] = {}
+        self._pending_status: Dict[str, tuple] = {}
+        self._last_fetch_times: Dict[str, str] = {}
     
     def fetch_all(self) -> List[FetchResult]:
         """Fetch data from all sources."""
@@ -91,16 +180,17 @@ class WeatherScheduler:
         
         logger.info("Starting full data sync")
         
-        # Clean up old data first
+        # Clean up old data first (stale alerts expire inside the alert ingest)
         self.database.cleanup_old_forecasts()
-        self.database.deactivate_old_alerts(hours=48)
         
-        # Fetch forecasts (XML)
-        forecast_result = self._fetch_forecasts()
+        # Fetch forecasts (XML) and alerts (RSS) concurrently; the two
+        # sources are independent and Database serializes the writes
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            forecast_future = executor.submit(self._fetch_forecasts)
+            alert_future = executor.submit(self._fetch_alerts)
+            forecast_result = forecast_future.result()
+            alert_result = alert_future.result()
         results.append(forecast_result)
-        
-        # Fetch alerts (RSS)
-        alert_result = self._fetch_alerts()
         results.append(alert_result)
         
         # Update sync status
@@ -114,36 +204,27 @@ class WeatherScheduler:
     def _fetch_forecasts(self) -> FetchResult:
         """Fetch and store XML forecasts."""
         try:
-            forecasts, metadata = self.fetcher.fetch_forecasts()
-            
-            # Store forecasts in database
-            added = 0
-            for forecast in forecasts:
-                if self.database.insert_forecast(
-                    city=forecast.city,
-                    forecast_date=forecast.forecast_date,
-                    data_date=forecast.data_date,
-                    temp_min=forecast.temp_min,
-                    temp_max=forecast.temp_max,
-                    conditions=forecast.conditions,
-                    conditions_code=forecast.conditions_code,
-                    source_url=forecast.source_url,
-                    content_hash=forecast.content_hash
-                ):
-                    added += 1
+            batch, metadata = self.fetcher.fetch_forecasts_batch()
             
-            # Update source status
-            self.database.update_source_status(
-                source_url=metadata.source_url,
-                source_type="forecast",
-                source_name=FORECAST_SOURCE["name"],
-                success=metadata.success,
-                data_quality=metadata.data_quality.value,
-                is_fresh=metadata.is_fresh,
-                entries_count=metadata.valid_entries,
-                error_message=metadata.error_message,
-                response_time_ms=metadata.response_time_ms
-            )
+            # Store forecasts and the source status in one commit; a 304
+            # re-serves rows that are already stored
+            with self.database.transaction():
+                if metadata.not_modified:
+                    added = 0
+                else:
+                    write_errors = self.database.write_errors
+                    added = self.database.bulk_insert_forecasts(batch.iter_rows())
+                    stored = self.database.write_errors == write_errors
+                
+                # Update source status
+                self._update_source_status(metadata, "forecast", FORECAST_SOURCE["name"])
+            # Any parsed feed may change the city list, even when every row
+            # was already stored; a 304 or repeated body leaves it as is
+            if not metadata.not_modified:
+                self._cities_dirty = True
+                # Conditional GETs only start from a payload that was stored
+                if stored:
+                    self.fetcher.commit_payload(metadata.source_url)
             
             result = FetchResult(
                 source_url=metadata.source_url,
@@ -159,6 +240,7 @@ class WeatherScheduler:
             )
             
             self._last_forecast_result = result
+            self._record_outcome('forecast_job', result.success)
             return result
             
         except Exception as e:
@@ -176,42 +258,38 @@ class WeatherScheduler:
                 response_time_ms=0
             )
             self._last_forecast_result = result
+            self._record_outcome('forecast_job', False)
             return result
     
     def _fetch_alerts(self) -> FetchResult:
         """Fetch and store RSS alerts."""
         try:
-            alerts, metadata = self.fetcher.fetch_alerts()
-            
-            # Store alerts in database
-            added = 0
-            for alert in alerts:
-                if self.database.insert_alert(
-                    title=alert.title,
-                    description=alert.description,
-                    published_at=alert.published_at,
-                    link=alert.link,
-                    alert_level=alert.alert_level,
-                    affected_zones=alert.affected_zones,
-                    time_range=alert.time_range,
-                    source_url=alert.source_url,
-                    content_hash=alert.content_hash
-                ):
-                    added += 1
-            
-            # Update source status
-            self.database.update_source_status(
-                source_url=metadata.source_url,
-                source_type="alert",
-                source_name=ALERT_SOURCE["name"],
-                success=metadata.success,
-                data_quality=metadata.data_quality.value,
-                is_fresh=metadata.is_fresh,
-                entries_count=metadata.valid_entries,
-                error_message=metadata.error_message,
-                response_time_ms=metadata.response_time_ms
+            alerts, metadata = self.fetcher.fetch_alerts(
+                is_known=self.database.is_known_alert
             )
             
+            # Expire stale alerts, store new ones and the source status in one
+            # commit; a 304 has nothing new to store, but stale alerts still expire
+            with self.database.transaction():
+                if metadata.not_modified:
+                    added = 0
+                    self.database.deactivate_old_alerts(ALERT_RETENTION_HOURS)
+                else:
+                    write_errors = self.database.write_errors
+                    added, _ = self.database.ingest_alerts([
+                        (alert.title, alert.description, alert.published_at,
+                         alert.link, alert.alert_level, alert.affected_zones,
+                         alert.time_range, alert.source_url, alert.content_hash)
+                        for alert in alerts
+                    ], deactivate_hours=ALERT_RETENTION_HOURS)
+                    stored = self.database.write_errors == write_errors
+                
+                # Update source status
+                self._update_source_status(metadata, "alert", ALERT_SOURCE["name"])
+            # Conditional GETs only start from a payload that was stored
+            if not metadata.not_modified and stored:
+                self.fetcher.commit_payload(metadata.source_url)
+            
             result = FetchResult(
                 source_url=metadata.source_url,
                 source_type="alert",
@@ -226,6 +304,14 @@ class WeatherScheduler:
             )
             
             self._last_alert_result = result
+            self._record_outcome('alert_job', result.success)
+            if added > 0:
+                self._alert_arrivals.append(
+                    (time.monotonic_ns(), self._base_intervals['alert_job'])
+                )
+                self._adapt_alert_interval()
+            elif result.success:
+                self._relax_alert_interval()
             return result
             
         except Exception as e:
@@ -243,8 +329,140 @@ class WeatherScheduler:
                 response_time_ms=0
             )
             self._last_alert_result = result
+            self._record_outcome('alert_job', False)
             return result
     
+    def _adapt_alert_interval(self) -> None:
+        """Re-time the alert job from the observed gaps between new alerts."""
+        if len(self._alert_arrivals) < 3:
+            return
+        arrivals = list(self._alert_arrivals)
+        gaps = []
+        for (earlier, _), (later, interval) in zip(arrivals, arrivals[1:]):
+            gap = (later - earlier) / 60_000_000_000
+            # A gap spanning about one poll only says alerts come at least
+            # that often; scaling it down would shrink the interval forever
+            gaps.append(gap if gap <= interval * ALERT_GAP_CENSOR_RATIO else gap * ALERT_GAP_FACTOR)
+        minutes = min(max(statistics.median(gaps), ALERT_MIN_INTERVAL_MINUTES), ALERT_MAX_INTERVAL_MINUTES)
+        self._set_alert_interval(minutes)
+    
+    def _relax_alert_interval(self) -> None:
+        """Stretch a shortened alert interval after a poll that found nothing."""
+        current = self._base_intervals['alert_job']
+        if current < self.alert_interval:
+            self._set_alert_interval(min(current * ALERT_RECOVERY_FACTOR, self.alert_interval))
+    
+    def _set_alert_interval(self, minutes: float) -> None:
+        """Adopt a new healthy alert interval (applied unless backing off)."""
+        self._base_intervals['alert_job'] = round(minutes, 1)
+        if not self._failures.get('alert_job'):
+            self._reschedule('alert_job', self._base_intervals['alert_job'])
+    
+    def _update_source_status(
+        self, metadata: FetchMetadata, source_type: str, source_name: str
+    ) -> None:
+        """
+        Record a poll in source_status, skipping the write if nothing changed.
+        
+        A successful poll whose (success, quality, freshness, entries, error)
+        fingerprint matches the last written status is only counted; the
+        counted polls are folded into the row when the status changes,
+        after STATUS_MAX_SKIPPED_WRITES of them, and on stop(); until then
+        get_source_status() adds them to what the database returns.
+        """
+        url = metadata.source_url
+        self._last_fetch_times[source_type] = metadata.fetch_time
+        fingerprint = (
+            metadata.success, metadata.data_quality.value, metadata.is_fresh,
+            metadata.valid_entries, metadata.error_message,
+        )
+        if metadata.success and fingerprint == self._last_status_fingerprint.get(url):
+            _, _, _, fetches, total_ms = self._pending_status.get(url, (None, None, None, 0, 0))
+            self._pending_status[url] = (
+                metadata, source_type, source_name,
+                fetches + 1, total_ms + metadata.response_time_ms,
+            )
+            if fetches + 1 > STATUS_MAX_SKIPPED_WRITES:
+                self._flush_source_status(url)
+            return
+        
+        self._flush_source_status(url)
+        self._pending_status[url] = (
+            metadata, source_type, source_name, 1, metadata.response_time_ms,
+        )
+        self._flush_source_status(url)
+        self._last_status_fingerprint[url] = fingerprint
+    
+    def _flush_source_status(self, url: str) -> None:
+        """Write the polls of a source not yet recorded in source_status."""
+        pending = self._pending_status.pop(url, None)
+        if pending is None:
+            return
+        metadata, source_type, source_name, fetches, total_ms = pending
+        self.database.update_source_status(
+            source_url=url,
+            source_type=source_type,
+            source_name=source_name,
+            success=metadata.success,
+            data_quality=metadata.data_quality.value,
+            is_fresh=metadata.is_fresh,
+            entries_count=metadata.valid_entries,
+            error_message=metadata.error_message,
+            response_time_ms=metadata.response_time_ms,
+            fetches=fetches,
+            total_response_time_ms=total_ms,
+            fetched_at=metadata.fetch_time
+        )
+    
+    def _record_outcome(self, job_id: str, success: bool) -> None:
+        """
+        Back a job off while its source keeps failing.
+        
+        Each consecutive failure stretches the interval by
+        FAILURE_BACKOFF_BASE (with jitter, up to the job's cap); the first
+        success restores the healthy interval.
+        """
+        if success:
+            if self._failures.pop(job_id, 0):
+                self._reschedule(job_id, self._base_intervals[job_id])
+            return
+        
+        failures = self._failures.get(job_id, 0) + 1
+        self._failures[job_id] = failures
+        cap = FORECAST_MAX_BACKOFF_MINUTES if job_id == 'forecast_job' else ALERT_MAX_BACKOFF_MINUTES
+        delay = self._base_intervals[job_id] * FAILURE_BACKOFF_BASE ** failures
+        delay *= 1 + random.uniform(-FAILURE_BACKOFF_JITTER, FAILURE_BACKOFF_JITTER)
+        self._reschedule(job_id, round(min(delay, cap), 1))
+    
+    def _reschedule(self, job_id: str, minutes: float) -> None:
+        """Change the interval of a running job (no-op if unchanged)."""
+        if not self._is_running or self._job_intervals.get(job_id) == minutes:
+            return
+        if job_id == 'forecast_job' and self._coalesced:
+            # No job of its own: _poll_sources reads the interval
+            self._job_intervals[job_id] = minutes
+            logger.info(f"Forecasts now every {minutes}min (on alert ticks)")
+            return
+        self.scheduler.reschedule_job(job_id, trigger=IntervalTrigger(minutes=minutes))
+        self._job_intervals[job_id] = minutes
+        logger.info(f"Rescheduled {job_id}: every {minutes}min")
+    
+    def _poll_sources(self) -> None:
+        """
+        Combined job used when the forecast interval is a multiple of the
+        alert interval: every tick polls alerts, and forecasts ride along
+        on the tick where they fall due, so both sources share one wake-up
+        and never contend for the write lock.
+        """
+        now_ns = time.monotonic_ns()
+        # Half a tick of slack so scheduling jitter cannot push the
+        # forecast poll to the following tick
+        slack_ns = int(self._job_intervals['alert_job'] * 30_000_000_000)
+        if now_ns >= self._next_forecast_ns - slack_ns:
+            self._fetch_forecasts()
+            self._next_forecast_ns = now_ns + int(self._job_intervals['forecast_job'] * 60_000_000_000)
+        self._fetch_alerts()
+    
     def _update_sync_status(self) -> None:
         """Update synchronization status."""
         now = datetime.utcnow().isoformat()
@@ -264,7 +482,7 @@ class WeatherScheduler:
             forecast_healthy=forecast_ok,
             alert_healthy=alert_ok,
             overall_quality=overall,
-            cities_available=len(self.fetcher.get_available_cities()),
+            cities_available=len(self.get_available_cities()),
             active_alerts=self.database.get_alert_count()
         )
     
@@ -274,44 +492,64 @@ class WeatherScheduler:
             logger.warning("Scheduler already running")
             return
         
-        # Forecast job (less frequent)
-        self.scheduler.add_job(
-            self._fetch_forecasts,
-            trigger=IntervalTrigger(minutes=self.forecast_interval),
-            id='forecast_job',
-            name='ANM XML Forecast Fetch',
-            max_instances=1,
-            coalesce=True,
-            replace_existing=True
-        )
+        # Aligned intervals (e.g. 60 / 10): one job polls both sources
+        self._coalesced = self.forecast_interval % self.alert_interval == 0
+        
+        if self._coalesced:
+            self._next_forecast_ns = time.monotonic_ns() + self.forecast_interval * 60_000_000_000
+        else:
+            # Forecast job (less frequent)
+            self.scheduler.add_job(
+                self._fetch_forecasts,
+                trigger=IntervalTrigger(minutes=self.forecast_interval),
+                id='forecast_job',
+                name='ANM XML Forecast Fetch',
+                max_instances=1,
+                coalesce=True,
+                replace_existing=True
+            )
         
         # Alert job (more frequent)
         self.scheduler.add_job(
-            self._fetch_alerts,
+            self._poll_sources if self._coalesced else self._fetch_alerts,
             trigger=IntervalTrigger(minutes=self.alert_interval),
             id='alert_job',
-            name='ANM RSS Alert Fetch',
+            name='ANM Forecast + Alert Poll' if self._coalesced else 'ANM RSS Alert Fetch',
             max_instances=1,
             coalesce=True,
             replace_existing=True
         )
         
         self.scheduler.start()
+        self._job_intervals = {
+            'forecast_job': self.forecast_interval,
+            'alert_job': self.alert_interval,
+        }
         self._is_running = True
         
         logger.info(f"Scheduler started: forecasts every {self.forecast_interval}min, "
-                   f"alerts every {self.alert_interval}min")
+                   f"alerts every {self.alert_interval}min"
+                   f"{' (single combined job)' if self._coalesced else ''}")
     
     def stop(self) -> None:
         """Stop the scheduler."""
         if not self._is_running:
             return
         self.scheduler.shutdown(wait=True)
+        self.fetcher.close()
+        with self.database.transaction():
+            for url in list(self._pending_status):
+                self._flush_source_status(url)
         self._is_running = False
         logger.info("Scheduler stopped")
     
     def trigger_immediate_fetch(self) -> List[FetchResult]:
-        """Trigger immediate fetch of all sources."""
+        """
+        Trigger immediate fetch of all sources.
+        
+        Blocking until both sources (fetched concurrently) are stored.
+        Async callers should dispatch this to a worker thread.
+        """
         return self.fetch_all()
     
     def get_last_results(self) -> List[FetchResult]:
@@ -328,21 +566,76 @@ class WeatherScheduler:
         return self._last_sync_status
     
     def get_available_cities(self) -> List[str]:
-        """Get list of available cities."""
-        return self.fetcher.get_available_cities()
+        """Get list of available cities (shared list; do not mutate)."""
+        if self._cities_dirty:
+            self._cached_cities = self.fetcher.get_available_cities()
+            self._cities_dirty = False
+        return self._cached_cities
+    
+    def get_source_status(self) -> List[Dict[str, Any]]:
+        """
+        Source status rows, including polls not yet written.
+        
+        Same shape and values as Database.get_system_status() would give
+        had every poll been written: the counted polls are added to the
+        counters, timestamps and response-time average of their row.
+        """
+        rows = self.database.get_system_status()
+        for row in rows:
+            pending = self._pending_status.get(row["source_url"])
+            if pending is None:
+                continue
+            metadata, _, _, fetches, total_ms = pending
+            stored = row["fetch_count"] or 0
+            fetch_count = stored + fetches
+            success_count = (row["success_count"] or 0) + fetches
+            row.update(
+                last_fetch_at=metadata.fetch_time,
+                last_success_at=metadata.fetch_time,
+                fetch_count=fetch_count,
+                success_count=success_count,
+                avg_response_time_ms=((row["avg_response_time_ms"] or 0) * stored + total_ms) // fetch_count,
+                last_response_time_ms=metadata.response_time_ms,
+                # Half away from zero, like SQLite's ROUND()
+                reliability_percent=int(success_count / fetch_count * 1000 + 0.5) / 10,
+            )
+        return rows
+    
+    def _next_coalesced_forecast_run(self, alert_job: Any) -> Optional[datetime]:
+        """
+        First tick of the combined job on which forecasts fall due.
+        
+        Mirrors the check in _poll_sources(), assuming the alert job keeps
+        its current interval.
+        """
+        if alert_job is None or alert_job.next_run_time is None:
+            return None
+        tick = timedelta(minutes=self._job_intervals.get('alert_job', self.alert_interval))
+        due_in = timedelta(microseconds=(self._next_forecast_ns - time.monotonic_ns()) // 1000)
+        due = datetime.now(alert_job.next_run_time.tzinfo) + due_in - tick / 2
+        ticks = max(0, math.ceil((due - alert_job.next_run_time) / tick))
+        return alert_job.next_run_time + ticks * tick
     
     def get_scheduler_status(self) -> dict:
         """Get scheduler status information."""
         forecast_job = self.scheduler.get_job('forecast_job')
         alert_job = self.scheduler.get_job('alert_job')
+        if self._coalesced:
+            next_forecast = self._next_coalesced_forecast_run(alert_job)
+        else:
+            next_forecast = forecast_job.next_run_time if forecast_job else None
         
         return {
             "is_running": self._is_running,
             "forecast_interval_minutes": self.forecast_interval,
             "alert_interval_minutes": self.alert_interval,
-            "next_forecast_run": forecast_job.next_run_time.isoformat() if forecast_job and forecast_job.next_run_time else None,
+            "current_alert_interval_minutes": self._job_intervals.get('alert_job', self.alert_interval),
+            "coalesced_polling": self._coalesced,
+            "last_forecast_fetch": self._last_fetch_times.get("forecast"),
+            "last_alert_fetch": self._last_fetch_times.get("alert"),
+            "next_forecast_run": next_forecast.isoformat() if next_forecast else None,
             "next_alert_run": alert_job.next_run_time.isoformat() if alert_job and alert_job.next_run_time else None,
-            "sync_status": asdict(self._last_sync_status) if self._last_sync_status else None,
+            "sync_status": self._last_sync_status.to_dict() if self._last_sync_status else None,
         }
     
     @property
@@ -0,0 +1,72 @@
+"""Regression tests for forecast bulk ingest and city search."""
+
+import os
+import tempfile
+import unittest
+
+from backend.database import Database
+
+
+def _row(city, temp, content_hash, forecast_date="2099-01-01"):
+    return (city, forecast_date, "2099-01-01", temp, temp + 5,
+            "CER SENIN", "clear", "http://example", content_hash)
+
+
+class BulkInsertForecastsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.tmp.name, "weather.db"))
+    
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+    
+    def _stored(self):
+        return sorted(
+            (f["city"], f["temp_min"])
+            for city in self.db.get_all_cities()
+            for f in self.db.get_city_forecast(city)
+        )
+    
+    def test_identical_rows_in_one_batch(self):
+        row = _row("Cluj", 1, b"h1")
+        self.assertEqual(self.db.bulk_insert_forecasts([row, row]), 1)
+        self.assertEqual(self._stored(), [("Cluj", 1)])
+    
+    def test_repeated_pair_keeps_last_row(self):
+        self.db.bulk_insert_forecasts([_row("Cluj", 1, b"h1"), _row("Cluj", 2, b"h2")])
+        self.assertEqual(self._stored(), [("Cluj", 2)])
+    
+    def test_bad_row_only_drops_itself(self):
+        bad = ("Iasi", "2099-01-01", "2099-01-01", None, 1, "", "", "http://example", b"hb")
+        added = self.db.bulk_insert_forecasts([_row("Cluj", 1, b"h1"), bad, _row("Arad", 3, b"h3")])
+        self.assertEqual(added, 2)
+        self.assertEqual(self._stored(), [("Arad", 3), ("Cluj", 1)])
+
+
+class SearchCitiesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.tmp.name, "weather.db"))
+        self.db.bulk_insert_forecasts([
+            _row(city, 1, city.encode("utf-8", "surrogatepass"))
+            for city in ("Cluj", "Arad", "a\U0010ffffb", "\ud7ffx")
+        ])
+    
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+    
+    def test_prefix_is_case_insensitive(self):
+        self.assertEqual(self.db.search_cities("cL"), ["Cluj"])
+    
+    def test_last_code_point_in_query(self):
+        self.assertEqual(self.db.search_cities("a\U0010ffff"), ["a\U0010ffffb"])
+        self.assertEqual(self.db.search_cities("\U0010ffff"), [])
+    
+    def test_query_ending_before_surrogates(self):
+        self.assertEqual(self.db.search_cities("\ud7ff"), ["\ud7ffx"])
+
+
+if __name__ == "__main__":
+    unittest.main()
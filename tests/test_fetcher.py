@@ -0,0 +1,86 @@
+"""Regression tests for RSS alert and XML forecast parsing."""
+
+import unittest
+
+from backend.fetcher import ANMFetcher
+
+
+RSS_WITH_HTML_ENTITIES = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel>
+<item>
+<title>Cod galben &icirc;n zona de munte &#537;i &acirc;n &Icirc;nalt</title>
+<description>COD: GALBEN In zona : Jude&#539;ul Cluj; Intre orele : 12:00 si 14:00</description>
+<pubDate>Mon, 06 Jan 2025 08:00:00 +0200</pubDate>
+</item>
+<item>
+<title>Informare &ndash; vant &bogus; puternic</title>
+<description>&lt;b&gt;COD: ROSU&lt;/b&gt; text</description>
+<pubDate>Mon, 06 Jan 2025 09:00:00 +0200</pubDate>
+</item>
+</channel></rss>"""
+
+
+class RssEntityTest(unittest.TestCase):
+    def setUp(self):
+        self.fetcher = ANMFetcher()
+    
+    def tearDown(self):
+        self.fetcher.close()
+    
+    def test_romanian_diacritic_entities_are_decoded(self):
+        root = ANMFetcher._parse_rss_root(RSS_WITH_HTML_ENTITIES)
+        titles = [item.findtext("title") for item in root.iter("item")]
+        self.assertEqual(titles[0], "Cod galben în zona de munte și ân Înalt")
+        self.assertEqual(titles[1], "Informare – vant &bogus; puternic")
+    
+    def test_escaped_markup_after_entity_is_kept(self):
+        root = ANMFetcher._parse_rss_root(RSS_WITH_HTML_ENTITIES)
+        descriptions = [item.findtext("description") for item in root.iter("item")]
+        self.assertEqual(descriptions[1], "<b>COD: ROSU</b> text")
+    
+    def test_parsed_alerts(self):
+        alerts, valid, total = self.fetcher._parse_alert_rss(RSS_WITH_HTML_ENTITIES)
+        self.assertEqual((valid, total), (2, 2))
+        self.assertEqual(alerts[0].title, "Cod galben în zona de munte și ân Înalt")
+        self.assertEqual(alerts[1].alert_level, "RED")
+    
+    def test_cdata_is_left_untouched(self):
+        content = (b"<rss><channel><item><description><![CDATA[a &icirc; <b>b</b>]]>"
+                   b"</description></item></channel></rss>")
+        root = ANMFetcher._parse_rss_root(content)
+        self.assertEqual(root.findtext(".//description"), "a &icirc; <b>b</b>")
+
+
+FORECAST_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<Prognoza_Oras>
+<localitate nume="Cluj"><DataPrognozei>{run}</DataPrognozei>
+<prognoza data="2099-01-02"><temp_min>-3</temp_min><temp_max>5</temp_max>
+<fenomen_descriere>Cer senin</fenomen_descriere><fenomen_simbol>{code}</fenomen_simbol></prognoza>
+</localitate>
+</Prognoza_Oras>"""
+
+
+class ForecastHashTest(unittest.TestCase):
+    def setUp(self):
+        self.fetcher = ANMFetcher()
+    
+    def tearDown(self):
+        self.fetcher.close()
+    
+    def _hash(self, run, code):
+        content = FORECAST_XML.format(run=run, code=code).encode("utf-8")
+        batch, _, _, _ = self.fetcher._parse_forecast_xml(content)
+        return batch.content_hashes[0]
+    
+    def test_new_run_changes_hash(self):
+        self.assertNotEqual(self._hash("2099-01-01", "1"), self._hash("2099-01-02", "1"))
+    
+    def test_conditions_code_changes_hash(self):
+        self.assertNotEqual(self._hash("2099-01-01", "1"), self._hash("2099-01-01", "2"))
+    
+    def test_same_content_same_hash(self):
+        self.assertEqual(self._hash("2099-01-01", "1"), self._hash("2099-01-01", "1"))
+
+
+if __name__ == "__main__":
+    unittest.main()